@@ -0,0 +1,48 @@
+"""
+Сравнение копирования разреженного файла: shutil.copy2 и src.fastcopy.copy_file
+
+Запуск из корня проекта:
+    python -m benchmarks.sparse_copy [размер в МиБ]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from src.fastcopy import copy_file
+
+
+def make_sparse(path: Path, size: int) -> None:
+    """Файл размером size с данными по 1 МиБ в начале, середине и конце"""
+    with open(path, "wb") as f:
+        f.truncate(size)
+        for offset in (0, size // 2, size - 1024 * 1024):
+            f.seek(offset)
+            f.write(os.urandom(1024 * 1024))
+
+
+def measure(copy, src: Path, dst: Path) -> tuple[float, int]:
+    start = time.perf_counter()
+    copy(src, dst)
+    elapsed = time.perf_counter() - start
+    return elapsed, os.stat(dst).st_blocks * 512
+
+
+def main() -> None:
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 2048
+    with tempfile.TemporaryDirectory() as tmp:
+        src = Path(tmp) / "image.raw"
+        make_sparse(src, size * 1024 * 1024)
+        print(f"Файл: {size} МиБ, на диске {os.stat(src).st_blocks * 512 // 1024 // 1024} МиБ")
+
+        for name, copy in (("shutil.copy2", shutil.copy2), ("fastcopy.copy_file", copy_file)):
+            dst = Path(tmp) / f"{name}.raw"
+            elapsed, used = measure(copy, src, dst)
+            print(f"{name:20} {elapsed:8.3f} с, на диске {used // 1024 // 1024} МиБ")
+            dst.unlink()
+
+
+if __name__ == "__main__":
+    main()
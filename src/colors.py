@@ -1,14 +1,30 @@
-RESET = "\033[0m"
+import os
+import sys
+
+
+def colors_enabled() -> bool:
+    """ANSI-цвета нужны только в терминале (и если не задан NO_COLOR)"""
+    if "NO_COLOR" in os.environ:
+        return False
+    try:
+        return sys.stdout.isatty()
+    except (AttributeError, ValueError):
+        return False
+
+
+_ON = colors_enabled()
+
+RESET = "\033[0m" if _ON else ""
 
 # Цвета текста
-RED = "\033[31m"
-GREEN = "\033[32m"
-YELLOW = "\033[33m"
-BLUE = "\033[34m"
-MAGENTA = "\033[35m"
-CYAN = "\033[36m"
-WHITE = "\033[37m"
+RED = "\033[31m" if _ON else ""
+GREEN = "\033[32m" if _ON else ""
+YELLOW = "\033[33m" if _ON else ""
+BLUE = "\033[34m" if _ON else ""
+MAGENTA = "\033[35m" if _ON else ""
+CYAN = "\033[36m" if _ON else ""
+WHITE = "\033[37m" if _ON else ""
 
 # Жирный и курсив
-BOLD = "\033[1m"
-ITALIC = "\033[3m"
\ No newline at end of file
+BOLD = "\033[1m" if _ON else ""
+ITALIC = "\033[3m" if _ON else ""
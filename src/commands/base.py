@@ -1,5 +1,8 @@
+from collections.abc import Iterator
 from pathlib import Path
 
+from src.output import CaptureOutput
+
 
 class Command:
     """
@@ -19,4 +22,19 @@ class Command:
         - cwd: текущий рабочий каталог
         - env: для undo 
         """
-        raise NotImplementedError("Метод run() должен быть переопределён")
\ No newline at end of file
+        raise NotImplementedError("Метод run() должен быть переопределён")
+
+    def stream(self, args: list[str], cwd: Path, env: dict, stdin: Iterator[str] | None = None) -> Iterator[str]:
+        """
+        Выполняет команду внутри конвейера и отдаёт вывод по строкам
+
+        - stdin: строки предыдущей команды (None — команда первая в конвейере)
+
+        По умолчанию команда не читает stdin, а её вывод собирается целиком;
+        команды, которые умеют работать с потоком строк, переопределяют метод
+        """
+        if stdin is not None:
+            raise ValueError(f"{self.name} не принимает данные из конвейера")
+        out = CaptureOutput()
+        self.run(args, cwd, {**env, "out": out})
+        yield from out.lines
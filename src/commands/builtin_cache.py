@@ -0,0 +1,41 @@
+from pathlib import Path
+
+from src.commands.base import Command
+from src.dircache import get_cache
+from src.output import get_output
+
+
+class CacheCmd(Command):
+    """
+    Статистика кэша каталогов сеанса
+    """
+
+    name = "cache"
+    help = "cache [clear]"
+    description = (
+        "Показывает состояние кэша содержимого каталогов:\n\
+        сколько каталогов в кэше, попадания, промахи и сбросы\n\
+        Поддерживает:\n\
+            clear — очистить кэш\n"
+    )
+
+    def run(self, args: list[str], cwd: Path, env: dict) -> None:
+        out = get_output(env)
+        cache = get_cache(env)
+        if cache is None:
+            out.write("Кэш каталогов не включён")
+            return
+
+        if args == ["clear"]:
+            cache.clear()
+            out.write("Кэш каталогов очищен")
+            return
+        if args:
+            raise ValueError(f"Использование: {self.help}")
+
+        stats = cache.stats()
+        total = stats["hits"] + stats["misses"]
+        ratio = f"{stats['hits'] / total:.0%}" if total else "—"
+        out.write(f"Каталогов в кэше: {stats['dirs']} (максимум {cache.max_dirs})")
+        out.write(f"Попаданий: {stats['hits']}, промахов: {stats['misses']}, доля попаданий: {ratio}")
+        out.write(f"Сбросов: {stats['invalidations']}")
@@ -1,6 +1,40 @@
+import errno
+import os
+import stat
+
 from pathlib import Path
+from collections.abc import Iterator
 from src.commands.base import Command
+from src.output import get_output
 from src.paths import to_path
+from src.pipeline import file_lines
+
+
+# размер куска при чтении файла: память не зависит от размера файла
+CHUNK_SIZE = 1024 * 1024
+
+# ошибки, при которых sendfile не поддерживается для этой пары дескрипторов
+SENDFILE_UNSUPPORTED = {errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP, errno.EXDEV}
+
+
+def send_file(src_fd: int, dst_fd: int) -> int:
+    """
+    Копирует файл в dst_fd внутри ядра через os.sendfile
+
+    Возвращает, сколько байт передано; если sendfile не поддерживается,
+    остаток докопирует вызывающий код обычным чтением
+    """
+    offset = 0
+    while True:
+        try:
+            sent = os.sendfile(dst_fd, src_fd, offset, CHUNK_SIZE)
+        except OSError as e:
+            if e.errno in SENDFILE_UNSUPPORTED:
+                return offset
+            raise
+        if sent == 0:
+            return offset
+        offset += sent
 
 
 class Cat(Command):
@@ -9,25 +43,64 @@ class Cat(Command):
     """
 
     name = "cat"
-    help = "cat <file>"
+    help = "cat <file> [file ...]"
     description = (
-        "Показывает содержимое указанного файла\n\
-        Если указан каталог или путь не существует,то выводит ошибку"
+        "Показывает содержимое указанных файлов подряд\n\
+        Файл читается кусками, поэтому размер файла не важен; если вывод\n\
+        перенаправлен в файл или канал, данные копируются средствами ядра (sendfile).\n\
+        Содержимое выводится как есть, без перекодирования\n\
+        Если указан каталог или путь не существует,то выводит ошибку\n\
+        В конвейере без файлов передаёт дальше строки предыдущей команды\n\
+        Пример:\n\
+            cat big.log | grep ERROR | head -n 50"
     )
 
     def run(self, args: list[str], cwd: Path, env: dict) -> None:
-        if not args:
-            raise ValueError("Нужно указать имя файла")
+        out = get_output(env)
+        targets = self._targets(args, cwd)
 
-        target = to_path(args[0], cwd)
+        out.flush()
+        fd = out.fileno()
+        use_sendfile = hasattr(os, "sendfile") and fd is not None and self._can_sendfile(fd)
 
-        if not target.exists():
-            raise FileNotFoundError("Файл не найден")
-        if target.is_dir():
-            raise IsADirectoryError("Указан каталог, а не файл")
+        for target in targets:
+            try:
+                with open(target, "rb") as f:
+                    offset = send_file(f.fileno(), fd) if use_sendfile else 0
+                    out.written += offset  # отправленное ядром мимо буфера тоже учитывается
+                    f.seek(offset)
+                    while chunk := f.read(CHUNK_SIZE):
+                        out.write_bytes(chunk)
+            except PermissionError:
+                raise PermissionError(f"Недостаточно прав для чтения файла: {target}")
+
+    def stream(self, args: list[str], cwd: Path, env: dict, stdin: Iterator[str] | None = None) -> Iterator[str]:
+        """Строки файлов по одной: следующая читается, только когда её запросили"""
+        if not args and stdin is not None:
+            yield from stdin
+            return
+        for target in self._targets(args, cwd):
+            yield from file_lines(target)
+
+    @staticmethod
+    def _targets(args: list[str], cwd: Path) -> list[Path]:
+        if not args:
+            raise ValueError("Нужно указать имя файла")
+        targets = [to_path(a, cwd) for a in args]
+        for target in targets:  # проверяем все пути до начала вывода
+            if not target.exists():
+                raise FileNotFoundError(f"Файл не найден: {target}")
+            if target.is_dir():
+                raise IsADirectoryError(f"Указан каталог, а не файл: {target}")
+        return targets
 
+    @staticmethod
+    def _can_sendfile(fd: int) -> bool:
+        """sendfile имеет смысл для обычного файла и канала, но не для терминала"""
         try:
-            text = target.read_text(encoding="utf-8")  # read_text из pathlib
-            print(text)
-        except PermissionError:
-            raise PermissionError("Недостаточно прав для чтения файла")
\ No newline at end of file
+            if os.isatty(fd):
+                return False
+            mode = os.fstat(fd).st_mode
+        except OSError:
+            return False
+        return stat.S_ISREG(mode) or stat.S_ISFIFO(mode) or stat.S_ISSOCK(mode)
@@ -1,5 +1,6 @@
 from pathlib import Path
 from src.commands.base import Command
+from src.dircache import path_kind
 from src.paths import to_path
 
 
@@ -17,9 +18,10 @@ class Cd(Command):
 
         target = to_path(args[0], cwd)  # меняем cwd на переданный путь
 
-        if not target.exists():
+        kind = path_kind(env, target)  # с кэшем сеанса — без отдельных stat
+        if kind is None:
             raise FileNotFoundError("Каталог не существует")
-        if not target.is_dir():
+        if kind != "dir":
             raise NotADirectoryError("Это не каталог")
 
         return target
\ No newline at end of file
@@ -0,0 +1,179 @@
+import os
+import pickle
+import stat
+from pathlib import Path
+
+from src.commands.base import Command
+from src.output import get_output
+from src.paths import to_path
+from src.util import human_size
+
+DU_CACHE_FILE = Path("src/data/.du_cache")
+
+
+def disk_usage(st: os.stat_result) -> int:
+    """Занятое на диске место в байтах (как у du), без st_blocks — логический размер"""
+    blocks = getattr(st, "st_blocks", None)
+    return blocks * 512 if blocks is not None else st.st_size
+
+
+def load_cache() -> dict:
+    try:
+        with open(DU_CACHE_FILE, "rb") as f:
+            data = pickle.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return {}
+
+
+def save_cache(data: dict) -> None:
+    DU_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = DU_CACHE_FILE.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, DU_CACHE_FILE)
+
+
+class Du(Command):
+    """
+    Подсчёт занятого места на диске
+    """
+
+    name = "du"
+    help = "du [-s] [-h] [--max-depth N] [--no-cache] [path]"
+    description = (
+        "Показывает, сколько места занимают каталог и его подкаталоги (в КиБ)\n\
+        Поддерживает:\n\
+            -s — только итог для указанного пути\n\
+            -h — размеры в удобном виде (K, M, G)\n\
+            --max-depth N — выводить каталоги не глубже N уровней\n\
+            --no-cache — пересчитать всё, не используя сохранённые итоги\n\
+        Файлы с несколькими жёсткими ссылками считаются один раз.\n\
+        Итоги по каждому каталогу сохраняются вместе с его mtime, поэтому при\n\
+        повторном запуске перечитываются только каталоги, где что-то добавили,\n\
+        удалили или переименовали. Изменение размера файла без изменения\n\
+        каталога так не заметить — для этого есть --no-cache\n"
+    )
+
+    def run(self, args: list[str], cwd: Path, env: dict) -> None:
+        out = get_output(env)
+        summarize = False
+        human = False
+        use_cache = True
+        max_depth = None
+        target_arg = None
+
+        it = iter(args)
+        for a in it:
+            if a == "-s":
+                summarize = True
+            elif a == "-h":
+                human = True
+            elif a == "--no-cache":
+                use_cache = False
+            elif a == "--max-depth" or a.startswith("--max-depth="):
+                value = a.partition("=")[2] or next(it, "")
+                if not value.isdigit():
+                    raise ValueError("После --max-depth нужно указать число")
+                max_depth = int(value)
+            elif a.startswith("-") and len(a) > 1:
+                raise ValueError(f"Неизвестный флаг: {a}")
+            else:
+                target_arg = a
+
+        if summarize:
+            max_depth = 0
+
+        target = to_path(target_arg, cwd)
+        try:
+            st = os.stat(target, follow_symlinks=False)
+        except FileNotFoundError:
+            raise FileNotFoundError("Нет такого файла или каталога")
+
+        def show(size: int, path: str) -> None:
+            shown = human_size(size) if human else str((size + 1023) // 1024)
+            out.write(f"{shown}\t{path}")
+
+        if not stat.S_ISDIR(st.st_mode):
+            show(disk_usage(st), str(target))
+            return
+
+        scan = DuScan(load_cache() if use_cache else {}, max_depth, show)
+        scan.scan(str(target), st, 0)
+        scan.forget_missing(str(target))
+        save_cache(scan.cache)
+
+
+class DuScan:
+    """
+    Один проход du по дереву
+
+    cache: путь каталога -> ((mtime_ns, ctime_ns), (st_dev, размер самого каталога),
+    файлы как (st_ino, размер), подкаталоги)
+    inode хранятся для всех файлов, а не только с st_nlink > 1: жёсткую ссылку могут
+    создать в другом каталоге, не меняя mtime каталога с уже учтённым файлом
+    """
+
+    def __init__(self, cache: dict, max_depth: int | None, show):
+        self.cache = cache
+        self.max_depth = max_depth
+        self.show = show
+        self.seen_inodes: set[tuple[int, int]] = set()
+        self.visited: set[str] = set()
+
+    def scan(self, path: str, st: os.stat_result, depth: int) -> int:
+        version = (st.st_mtime_ns, st.st_ctime_ns)
+        cached = self.cache.get(path)
+        if cached is not None and cached[0] == version:
+            _, (dev, own), files, subdirs = cached
+        else:
+            dev, own = st.st_dev, disk_usage(st)
+            files, subdirs = self._read_dir(path)
+            self.cache[path] = (version, (dev, own), files, subdirs)
+        self.visited.add(path)
+
+        total = own
+        seen = self.seen_inodes
+        for ino, size in files:
+            if (dev, ino) not in seen:
+                seen.add((dev, ino))
+                total += size
+
+        for name in subdirs:
+            sub = os.path.join(path, name)
+            try:
+                sub_st = os.stat(sub, follow_symlinks=False)
+            except OSError:
+                continue  # подкаталог удалён после того, как попал в кэш
+            if stat.S_ISDIR(sub_st.st_mode):
+                total += self.scan(sub, sub_st, depth + 1)
+
+        if self.max_depth is None or depth <= self.max_depth:
+            self.show(total, path)
+        return total
+
+    @staticmethod
+    def _read_dir(path: str) -> tuple[list[tuple[int, int]], list[str]]:
+        files = []
+        subdirs = []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.name)
+                            continue
+                        est = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    files.append((est.st_ino, disk_usage(est)))
+        except PermissionError:
+            pass  # считаем только сам каталог
+        return files, subdirs
+
+    def forget_missing(self, root: str) -> None:
+        """Убирает из кэша каталоги под root, которых больше нет"""
+        prefix = root.rstrip(os.sep) + os.sep
+        for path in list(self.cache):
+            if path.startswith(prefix) and path not in self.visited:
+                del self.cache[path]
@@ -1,7 +1,241 @@
+import codecs
+import mmap
+import os
 import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
 from pathlib import Path
+from typing import BinaryIO, NamedTuple
+from collections.abc import Iterable, Iterator
 from src.commands.base import Command
+from src.dircache import get_cache
+from src.output import Output, get_output
 from src.paths import to_path
+from src.util import positive_int
+from src.search_index import TrigramIndex, required_literals
+from src.walk import DEFAULT_EXCLUDES, split_excludes, walk_files
+
+
+# меньше этого числа файлов пул процессов не окупает свой запуск
+PARALLEL_MIN_FILES = 32
+
+# сколько файлов отправляется в процесс пула за один раз
+BATCH_SIZE = 64
+
+# символы, которые делают шаблон регулярным выражением, а не простой строкой
+REGEX_META = set(".^$*+?{}[]\\|()")
+
+# сколько байт с начала файла проверяется на признаки бинарного файла
+BINARY_PROBE = 8192
+
+# имя источника в выводе -l, когда grep читает строки из конвейера
+STDIN_NAME = "(стандартный ввод)"
+
+# конструкции регулярок, которые нельзя применять к байтам файла целиком:
+# любой символ, классы символов, перевод строки и отрицательные наборы
+TEXT_ONLY_SYNTAX = re.compile(r"\.|\\[wWsSdDbBn]|\[\^")
+
+# размер куска для подсчёта переводов строк в mmap (у mmap нет метода count)
+COUNT_CHUNK = 1 << 20
+
+
+class GrepOptions(NamedTuple):
+    """Разобранные аргументы команды"""
+
+    recursive: bool
+    ignore_case: bool
+    fixed: bool
+    encoding: str
+    mode: str
+    max_count: int
+    use_index: bool
+    use_ignore: bool
+    jobs: int | None
+    exclude: list[str]
+    rest: list[str]             # шаблон и путь
+
+
+class Query(NamedTuple):
+    """Параметры поиска, которые передаются в процессы пула"""
+
+    pattern: str
+    flags: int
+    literal: bool       # искать как простую строку через find
+    encoding: str
+    mode: str = "lines"     # lines — строки, files — только имена (-l), count — число (-c)
+    max_count: int = 0      # остановиться после N совпадений в файле (-m), 0 — без ограничения
+
+
+def is_literal(pattern: str) -> bool:
+    """Шаблон без метасимволов можно искать обычным bytes.find"""
+    return not any(ch in REGEX_META for ch in pattern)
+
+
+def count_newlines(buf, start: int, end: int) -> int:
+    """Считает переводы строк в buf[start:end] кусками, не копируя весь диапазон сразу"""
+    total = 0
+    while start < end:
+        stop = min(start + COUNT_CHUNK, end)
+        total += buf[start:stop].count(b"\n")
+        start = stop
+    return total
+
+
+def is_ascii_compatible(encoding: str) -> bool:
+    """
+    Кодируются ли ASCII-символы и перевод строки в кодировке как в ASCII
+
+    У utf-16/utf-32 это не так: по байтам файла в них нельзя искать строки,
+    а нулевые байты — обычная часть текста, а не признак бинарного файла
+    """
+    return "a\n".encode(encoding) == b"a\n"
+
+
+def needs_text_search(query: Query) -> bool:
+    """
+    Шаблон, который по байтам mmap нашёл бы не то же, что по строкам текста
+
+    Байтовая регулярка видит многобайтовый символ как несколько байт (`пр.вет`,
+    `[иа]`, `\\w` не совпадут с кириллицей), а `\\s` и `[^...]` совпадают с
+    переводом строки. Простая строка ищется по байтам точно, кроме поиска
+    без учёта регистра: bytes-регулярки игнорируют регистр только у ASCII
+    """
+    if not is_ascii_compatible(query.encoding):
+        return True
+    if query.literal:
+        return bool(query.flags & re.IGNORECASE) and not query.pattern.isascii()
+    return not query.pattern.isascii() or TEXT_ONLY_SYNTAX.search(query.pattern) is not None
+
+
+def search_batch(files: list[Path], query: Query) -> list[tuple[list[str], int, str | None]]:
+    """Поиск по пачке файлов в одном процессе пула"""
+    return [search_file(file, query) for file in files]
+
+
+def is_binary(block: bytes) -> bool:
+    """Файл считается бинарным, если в начальном блоке есть нулевой байт"""
+    return b"\0" in block
+
+
+def search_file(file: Path, query: Query) -> tuple[list[str], int, str | None]:
+    """
+    Ищет шаблон в одном файле
+
+    Возвращает строки для вывода, число совпадений и текст ошибки (или None).
+    Бинарные файлы пропускаются по первому блоку без полного чтения.
+    Функция верхнего уровня, чтобы её можно было отправить в пул процессов
+    """
+    limit = 1 if query.mode == "files" else query.max_count  # для -l хватает первого совпадения
+    try:
+        with open(file, "rb") as f:
+            if is_ascii_compatible(query.encoding) and is_binary(f.read(BINARY_PROBE)):
+                return [], 0, None
+            if needs_text_search(query):
+                hits = list(search_text(file, query, limit))
+            else:
+                hits = list(search_buffer(f, query, limit))
+    except Exception as e:
+        return [], 0, f"Ошибка при чтении {file}: {e}"
+
+    if query.mode == "files":
+        lines = [str(file)] if hits else []
+    elif query.mode == "count":
+        lines = [f"{file}:{len(hits)}"]
+    else:
+        lines = [f"{file}:{lineno}:{line.strip()}" for lineno, line in hits]
+    return lines, len(hits), None
+
+
+def search_buffer(f: BinaryIO, query: Query, limit: int = 0):
+    """
+    Поиск по отображённому в память файлу целиком
+
+    Шаблон прогоняется по всему буферу, номер строки восстанавливается только
+    для найденных совпадений. Каждая строка выдаётся не более одного раза,
+    после limit совпадений (если limit > 0) поиск прекращается
+    """
+    if os.fstat(f.fileno()).st_size == 0:
+        return  # пустой файл нельзя отобразить в память
+    need_lines = query.mode == "lines"  # для -l и -c номера и текст строк не нужны
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        needle = query.pattern.encode(query.encoding)
+        if query.literal and not query.flags & re.IGNORECASE:
+            def find(pos):
+                return buf.find(needle, pos)  # быстрый путь без регулярок
+        else:
+            source = re.escape(needle) if query.literal else needle
+            regex = re.compile(source, query.flags | re.MULTILINE)
+
+            def find(pos):
+                m = regex.search(buf, pos)
+                return m.start() if m else -1
+
+        size = len(buf)
+        # после завершающего перевода строки новой строки нет: пустое совпадение
+        # (^$, x*) в самом конце файла не считается
+        end = size - 1 if buf[size - 1:size] == b"\n" else size
+        pos = 0
+        lineno = 1
+        counted = 0  # до этой позиции переводы строк уже посчитаны
+        hits = 0
+        while pos <= end:
+            start = find(pos)
+            if start < 0 or start > end:
+                break
+            line_end = buf.find(b"\n", start)
+            if line_end < 0:
+                line_end = size
+            if need_lines:
+                line_start = buf.rfind(b"\n", 0, start) + 1
+                lineno += count_newlines(buf, counted, line_start)
+                counted = line_start
+                yield lineno, buf[line_start:line_end].decode(query.encoding, errors="replace")
+            else:
+                yield 0, ""
+            hits += 1
+            if limit and hits >= limit:
+                break
+            pos = line_end + 1  # остальные совпадения в этой строке не нужны
+
+
+def match_lines(lines: Iterable[str], query: Query) -> Iterator[str]:
+    """
+    Фильтр строк для конвейера: строки читаются, пока они нужны
+
+    После -m N совпадений (или первого совпадения при -l) следующие строки
+    не запрашиваются, и команды выше по конвейеру перестают читать
+    """
+    source = re.escape(query.pattern) if query.literal else query.pattern
+    regex = re.compile(source, query.flags)
+    hits = 0
+    for line in lines:
+        if not regex.search(line):
+            continue
+        hits += 1
+        if query.mode == "files":
+            yield STDIN_NAME
+            return
+        if query.mode == "lines":
+            yield line
+        if query.max_count and hits >= query.max_count:
+            break
+    if query.mode == "count":
+        yield str(hits)
+
+
+def search_text(file: Path, query: Query, limit: int = 0):
+    """Построчный поиск по декодированному тексту"""
+    source = re.escape(query.pattern) if query.literal else query.pattern
+    regex = re.compile(source, query.flags)
+    hits = 0
+    with open(file, "r", encoding=query.encoding, errors="ignore") as f:
+        for lineno, line in enumerate(f, start=1):
+            if regex.search(line):  # находит первое вхождение regex в строке
+                yield lineno, line
+                hits += 1
+                if limit and hits >= limit:
+                    break
 
 
 class Grep(Command):
@@ -10,54 +244,218 @@ class Grep(Command):
     """
 
     name = "grep"
-    help = "grep [-r] [-i] <pattern> <path>"
+    help = (
+        "grep [-r] [-i] [-F] [-l | -c] [-m N] [-j N] [--encoding ENC] [--no-index] "
+        "[--exclude GLOB] [--no-ignore] <pattern> <path>"
+    )
     description = (
         "Ищет строки, соответствующие шаблону в указанных файлах.\n\
         Поддерживает:\n\
             -r — рекурсивный поиск\n\
             -i — поиск без учёта регистра\n\
+            -F — искать шаблон как обычную строку, а не регулярное выражение\n\
+            -l — выводить только имена файлов с совпадениями\n\
+            -c — выводить число совпавших строк в каждом файле\n\
+            -m N — остановить поиск в файле после N совпадений\n\
+            --encoding ENC — кодировка файлов (по умолчанию utf-8)\n\
+            --no-index — не использовать индекс, построенный командой index\n\
+            --exclude GLOB — пропускать файлы и каталоги по шаблону (можно несколько раз)\n\
+            --no-ignore — не учитывать .gitignore и не пропускать .git, node_modules, __pycache__\n\
+            -j N — число процессов для поиска (по умолчанию число ядер при -r)\n\
         Пример:\n\
-            grep main src/\n"
+            grep main src/\n\
+            grep -r -j 4 TODO src/\n\
+            grep -r -l main src/\n\
+            cat app.log | grep -i error\n\
+        В конвейере без пути ищет в строках предыдущей команды\n\
+        Бинарные файлы (с нулевыми байтами в начале) пропускаются\n"
     )
 
     def run(self, args: list[str], cwd: Path, env: dict) -> None:
-        if len(args) < 2:
-            raise ValueError("Использование: grep [-r] [-i] <pattern> <path>")
+        out = get_output(env)
+        for line in self._matches(self._parse_args(args), cwd, env, out):
+            out.write(line)
+
+    def stream(self, args: list[str], cwd: Path, env: dict, stdin: Iterator[str] | None = None) -> Iterator[str]:
+        """
+        В конвейере без пути ищет в строках предыдущей команды, по одной строке
 
-        recursive = "-r" in args
-        ignore_case = "-i" in args
-        args = [a for a in args if a not in ("-r", "-i")]
+        С путём отдаёт совпадения по мере поиска по файлам; ошибки чтения и
+        «Совпадений не найдено» выводятся оболочкой, а не передаются дальше
+        по конвейеру как найденные строки
+        """
+        opts = self._parse_args(args)
+        if stdin is None or len(opts.rest) > 1:
+            yield from self._matches(opts, cwd, env, get_output(env))
+            return
+        if not opts.rest:
+            raise ValueError(f"Использование: {self.help}")
+        yield from match_lines(stdin, self._make_query(opts.rest[0], opts))
 
-        pattern, path_str = args[0], args[1]
+    def _matches(self, opts: GrepOptions, cwd: Path, env: dict, status: Output) -> Iterator[str]:
+        """Найденные строки по файлам пути; ошибки чтения и итог пишутся в status"""
+        if len(opts.rest) < 2:
+            raise ValueError(f"Использование: {self.help}")
+
+        pattern, path_str = opts.rest[0], opts.rest[1]
         path = to_path(path_str, cwd)
 
         if not path.exists():
             raise FileNotFoundError(f"{path} не найден")
 
-        flags = re.IGNORECASE if ignore_case else 0
-        regex = re.compile(pattern, flags)  # делает шаблон для поиска
+        query = self._make_query(pattern, opts)
 
-        files = []
         if path.is_file():
-            files = [path]
+            files: Iterable[Path] = [path]
         elif path.is_dir():
-            if recursive:
-                files = [p for p in path.rglob("*") if p.is_file()]  # по пути рекурсивно ищет файлы и каталоги
-            else:
-                files = [p for p in path.iterdir() if p.is_file()]  # перечисляет содержимое каталога
+            entries = walk_files(
+                path,
+                exclude=opts.exclude + (list(DEFAULT_EXCLUDES) if opts.use_ignore else []),
+                ignore_files=opts.use_ignore,
+                recursive=opts.recursive,
+                cache=get_cache(env),
+            )
+            if opts.use_index and query.mode != "count":
+                # -c выводит каждый файл, в том числе с нулём совпадений
+                entries = self._narrow_by_index(entries, path, query)
+            files = (Path(entry.path) for _, entry in entries)
         else:
             raise ValueError("Указан неверный путь")
 
+        jobs = opts.jobs
+        if jobs is None:
+            jobs = (os.cpu_count() or 1) if opts.recursive else 1
+
         matches = 0
-        for file in files:
-            try:
-                with open(file, "r", encoding="utf-8", errors="ignore") as f:
-                    for lineno, line in enumerate(f, start=1):
-                        if regex.search(line):  # находит первое вхождение regex в строке
-                            matches += 1
-                            print(f"{file}:{lineno}:{line.strip()}")
-            except Exception as e:
-                print(f"Ошибка при чтении {file}: {e}")
+        for found, count, error in self._search(files, query, jobs):
+            yield from found
+            matches += count
+            if error:
+                status.write(error)
 
         if matches == 0:
-            print("Совпадений не найдено")
\ No newline at end of file
+            status.write("Совпадений не найдено")
+
+    @staticmethod
+    def _parse_args(args: list[str]) -> GrepOptions:
+        recursive = False
+        ignore_case = False
+        fixed = False
+        encoding = "utf-8"
+        mode = "lines"
+        max_count = 0
+        use_index = True
+        use_ignore = True
+        jobs = None
+        rest = []
+
+        args, exclude = split_excludes(args)
+        it = iter(args)
+        for a in it:
+            if a == "-r":
+                recursive = True
+            elif a == "-i":
+                ignore_case = True
+            elif a == "-F":
+                fixed = True
+            elif a == "--encoding" or a.startswith("--encoding="):
+                encoding = a.partition("=")[2] or next(it, "")
+            elif a == "--no-index":
+                use_index = False
+            elif a == "--no-ignore":
+                use_ignore = False
+            elif a == "-l":
+                mode = "files"
+            elif a == "-c":
+                mode = "count"
+            elif a == "-j" or (a.startswith("-j") and a[2:].isdigit()):
+                jobs = positive_int(a[2:] or next(it, ""), "-j")
+            elif a == "-m" or (a.startswith("-m") and a[2:].isdigit()):
+                max_count = positive_int(a[2:] or next(it, ""), "-m")
+            else:
+                rest.append(a)
+        return GrepOptions(
+            recursive, ignore_case, fixed, encoding, mode, max_count, use_index, use_ignore, jobs, exclude, rest
+        )
+
+    @staticmethod
+    def _make_query(pattern: str, opts: GrepOptions) -> Query:
+        """Проверяет кодировку и шаблон до начала поиска"""
+        try:
+            codecs.lookup(opts.encoding)
+        except LookupError:
+            raise ValueError(f"Неизвестная кодировка: {opts.encoding}")
+
+        flags = re.IGNORECASE if opts.ignore_case else 0
+        literal = opts.fixed or is_literal(pattern)
+        if not literal:
+            re.compile(pattern, flags)  # проверяем шаблон до запуска поиска
+        return Query(pattern, flags, literal, opts.encoding, opts.mode, opts.max_count)
+
+    def _narrow_by_index(self, entries, path: Path, query: Query):
+        """
+        Отбрасывает файлы, в которых по триграммному индексу шаблона быть не может
+
+        Файлы, изменившиеся после построения индекса (или новые), проверяются всегда,
+        поэтому устаревший индекс не теряет совпадений
+        """
+        index = TrigramIndex.find(path)
+        if index is None:
+            yield from entries
+            return
+        if query.flags & re.IGNORECASE and not query.pattern.isascii():
+            yield from entries  # индекс приводит к нижнему регистру только ASCII
+            return
+        if not is_ascii_compatible(query.encoding):
+            yield from entries  # utf-16 и т.п. не сопоставить с байтами индекса
+            return
+
+        literals = [
+            lit.encode(query.encoding, errors="ignore")
+            for lit in required_literals(query.pattern, query.literal)
+        ]
+        candidates = index.candidates(literals)
+        if candidates is None:
+            yield from entries
+            return
+
+        prefix = path.relative_to(index.root).as_posix()
+        for rel, entry in entries:
+            try:
+                st = entry.stat()  # DirEntry кэширует stat
+            except OSError:
+                yield rel, entry
+                continue
+            file_id = index.is_fresh(rel if prefix == "." else f"{prefix}/{rel}", st)
+            if file_id is None or file_id in candidates:
+                yield rel, entry
+
+    def _search(self, files: Iterable[Path], query: Query, jobs: int):
+        """
+        Результаты поиска по каждому файлу в исходном порядке файлов
+
+        При jobs > 1 файлы пачками раздаются пулу процессов. Пачек в работе не больше
+        нескольких на процесс, а результаты забираются по порядку отправки, поэтому
+        вывод сгруппирован по файлам, не зависит от числа процессов и начинается
+        до окончания обхода дерева
+        """
+        files = iter(files)
+        head = list(islice(files, PARALLEL_MIN_FILES))
+        if jobs <= 1 or len(head) < PARALLEL_MIN_FILES:
+            for file in chain(head, files):
+                yield search_file(file, query)
+            return
+
+        files = chain(head, files)
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            pending: deque = deque()
+            try:
+                while batch := list(islice(files, BATCH_SIZE)):
+                    pending.append(pool.submit(search_batch, batch, query))
+                    if len(pending) >= jobs * 4:
+                        yield from pending.popleft().result()
+                while pending:
+                    yield from pending.popleft().result()
+            finally:
+                for future in pending:  # конвейер закрыт раньше (head): не ждём лишние пачки
+                    future.cancel()
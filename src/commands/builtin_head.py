@@ -0,0 +1,87 @@
+from collections.abc import Iterator
+from itertools import islice
+from pathlib import Path
+
+from src.commands.base import Command
+from src.output import get_output
+from src.paths import to_path
+from src.pipeline import close_stream, file_lines
+from src.util import BLOCK_SIZE
+
+
+def parse_lines_arg(args: list[str], usage: str, need_file: bool = True) -> tuple[int, list[str]]:
+    """Выделяет из аргументов -n N (или -nN); по умолчанию 10 строк"""
+    n = 10
+    rest = []
+    it = iter(args)
+    for a in it:
+        if a == "-n" or (a.startswith("-n") and a[2:].isdigit()):
+            value = a[2:] or next(it, "")
+            if not value.isdigit():
+                raise ValueError("После -n нужно указать число строк")
+            n = int(value)
+        else:
+            rest.append(a)
+    if not rest and need_file:
+        raise ValueError(f"Использование: {usage}")
+    return n, rest
+
+
+def check_file(target: Path) -> None:
+    if not target.exists():
+        raise FileNotFoundError("Файл не найден")
+    if target.is_dir():
+        raise IsADirectoryError("Указан каталог, а не файл")
+
+
+class Head(Command):
+    """
+    Первые строки файла
+    """
+
+    name = "head"
+    help = "head [-n N] <file>"
+    description = (
+        "Показывает первые N строк файла (по умолчанию 10)\n\
+        Читается только начало файла, сколько нужно для N строк\n\
+        В конвейере берёт первые N строк предыдущей команды и останавливает её\n\
+        Пример:\n\
+            head -n 5 shell.log\n\
+            cat big.log | grep ERROR | head -n 50"
+    )
+
+    def run(self, args: list[str], cwd: Path, env: dict) -> None:
+        out = get_output(env)
+        n, rest = parse_lines_arg(args, self.help)
+        target = to_path(rest[0], cwd)
+        check_file(target)
+
+        if n == 0:
+            return
+        with open(target, "rb") as f:
+            left = n
+            while block := f.read(BLOCK_SIZE):
+                end = 0
+                while left:
+                    pos = block.find(b"\n", end)
+                    if pos < 0:
+                        break
+                    end = pos + 1
+                    left -= 1
+                if not left:
+                    out.write_bytes(block[:end])
+                    return
+                out.write_bytes(block)
+
+    def stream(self, args: list[str], cwd: Path, env: dict, stdin: Iterator[str] | None = None) -> Iterator[str]:
+        n, rest = parse_lines_arg(args, self.help, need_file=stdin is None)
+        if rest:
+            target = to_path(rest[0], cwd)
+            check_file(target)
+            source = file_lines(target)
+        else:
+            source = stdin
+        try:
+            yield from islice(source, n)
+        finally:
+            close_stream(source)  # остальные строки выше по конвейеру не нужны
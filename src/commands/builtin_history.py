@@ -1,5 +1,8 @@
 from pathlib import Path
 from src.commands.base import Command
+from src.history import get_store
+from src.output import get_output
+from src.util import positive_int
 
 
 HISTORY_FILE = Path("src/data/.history")
@@ -11,19 +14,38 @@ class HistoryCmd(Command):
     """
 
     name = "history"
-    help = "history [N]"
+    help = "history [N] | history -s <pattern>"
     description = (
-        "Показывает последние N введённых команд\n\
-        История сохраняется между запусками\n\
+        "Показывает последние N введённых команд (по умолчанию 20)\n\
+        История сохраняется между запусками; рядом с ней хранится индекс\n\
+        смещений строк, поэтому последние N команд читаются сразу, без\n\
+        просмотра всего файла. Большая история уходит в .history.1, .history.2 ...\n\
+        Поддерживает:\n\
+            -s <pattern> — найти команды, содержащие pattern (файлы читаются построчно)\n\
         Пример: history 10"
     )
 
     def run(self, args: list[str], cwd: Path, env: dict) -> None:
-        n = int(args[0]) if args else 20
-        if not HISTORY_FILE.exists():
-            print("(История пока пуста)")
+        out = get_output(env)
+        store = get_store(HISTORY_FILE)
+
+        if args and args[0] == "-s":
+            if len(args) != 2:
+                raise ValueError("Использование: history -s <pattern>")
+            found = False
+            for number, cmd in store.search(args[1]):
+                out.write(f"{number}: {cmd}")
+                found = True
+            if not found:
+                out.write("Ничего не найдено")
             return
 
-        lines = HISTORY_FILE.read_text(encoding="utf-8").splitlines()
-        for i, cmd in enumerate(lines[-n:], start=max(1, len(lines) - n + 1)):  # чтобы не уходило в отрицательные
-            print(f"{i}: {cmd}")
\ No newline at end of file
+        if len(args) > 1:
+            raise ValueError(f"Использование: {self.help}")
+        n = positive_int(args[0], "history") if args else 20
+        lines = store.tail(n)
+        if not lines:
+            out.write("(История пока пуста)")
+            return
+        for number, cmd in lines:
+            out.write(f"{number}: {cmd}")
@@ -0,0 +1,55 @@
+from pathlib import Path
+
+from src.commands.base import Command
+from src.output import get_output
+from src.paths import to_path
+from src.search_index import TrigramIndex
+
+
+class IndexCmd(Command):
+    """
+    Триграммный индекс каталога для ускорения grep
+    """
+
+    name = "index"
+    help = "index build <dir> | index update [dir]"
+    description = (
+        "Строит и обновляет индекс триграмм, который grep использует,\n\
+        чтобы не читать файлы, где шаблона точно нет\n\
+        Поддерживает:\n\
+            build <dir> — построить индекс заново\n\
+            update [dir] — перечитать только новые и изменённые файлы\n\
+                           (по размеру и времени изменения)\n\
+        Примеры:\n\
+            index build src\n\
+            index update\n"
+    )
+
+    def run(self, args: list[str], cwd: Path, env: dict) -> None:
+        out = get_output(env)
+        if not args or args[0] not in ("build", "update") or len(args) > 2:
+            raise ValueError(f"Использование: {self.help}")
+
+        action = args[0]
+        target = to_path(args[1] if len(args) > 1 else None, cwd)
+
+        if not target.exists():
+            raise FileNotFoundError("Каталог не существует")
+        if not target.is_dir():
+            raise NotADirectoryError("Это не каталог")
+
+        if action == "build":
+            index = TrigramIndex(target)
+        else:
+            index = TrigramIndex.find(target)
+            if index is None:
+                raise FileNotFoundError(
+                    f"Индекс для {target} не найден, сначала выполните: index build <dir>"
+                )
+
+        changed, removed, unchanged = index.update()
+        index.save()
+        out.write(
+            f"Индекс {index.root}: обновлено {changed}, удалено {removed}, "
+            f"без изменений {unchanged}, триграмм {len(index.postings)}"
+        )
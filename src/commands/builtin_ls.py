@@ -1,36 +1,90 @@
+import os
 import stat
 
 from pathlib import Path
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 
 from src.commands.base import Command
+from src.dircache import get_cache
+from src.output import get_output
 from src.paths import to_path
 
 
-def format_long(p: Path) -> str:
-    """для флага -l: права, размер, дата, имя"""
-    s = p.stat() # чтобы получить инфу о правах доступа
+# сколько записей за раз отдаётся пулу потоков в режиме -U
+STAT_BATCH = 256
+
+
+def format_long(p, st: os.stat_result | None = None) -> str:
+    """для флага -l: права, размер, дата, имя (p — Path или os.DirEntry)"""
+    s = st if st is not None else p.stat() # чтобы получить инфу о правах доступа
     perms = stat.filemode(s.st_mode)
     size = f"{s.st_size:>8}"
     dt = datetime.fromtimestamp(s.st_mtime).strftime("%Y-%m-%d %H:%M")
     return f"{perms} {size} {dt} {p.name}"
 
 
+def entry_stat(entry) -> os.stat_result:
+    """
+    stat записи каталога; DirEntry запоминает результат, поэтому
+    сортировка и длинный формат обходятся одним системным вызовом
+    """
+    try:
+        return entry.stat()
+    except FileNotFoundError:
+        return entry.stat(follow_symlinks=False)  # битая символьная ссылка
+
+
 class Ls(Command):
     """
     Выводит содержимое каталога
     """
 
     name = "ls"
-    help = "ls [-l] [path]"
+    help = "ls [-l] [-R] [-U | -S | -t] [-j N] [path]"
+    description = (
+        "Показывает содержимое каталога (по имени без учёта регистра)\n\
+        Поддерживает:\n\
+            -l — подробный формат (права, размер, дата, имя)\n\
+            -R — рекурсивно, с заголовком для каждого каталога\n\
+            -U — без сортировки: записи выводятся сразу по мере чтения каталога\n\
+            -S — по размеру, сначала большие\n\
+            -t — по времени изменения, сначала новые\n\
+            -j N — запрашивать метаданные (stat) в N потоков, полезно на сетевых\n\
+                   файловых системах; порядок вывода не меняется\n\
+        Флаги можно объединять: ls -lS\n"
+    )
 
     def run(self, args: list[str], cwd: Path, env: dict) -> Path | None:
+        out = get_output(env)
         long = False
+        recursive = False
+        sort = "name"
+        workers = 0
         target_arg = None
 
-        for a in args:
-            if a == "-l":
-                long = True
+        it = iter(args)
+        for a in it:
+            if a == "-j" or (a.startswith("-j") and a[2:].isdigit()):
+                value = a[2:] or next(it, "")
+                if not value.isdigit() or int(value) < 1:
+                    raise ValueError("После -j нужно указать положительное число потоков")
+                workers = int(value)
+            elif a.startswith("-") and len(a) > 1:
+                for flag in a[1:]:
+                    if flag == "l":
+                        long = True
+                    elif flag == "R":
+                        recursive = True
+                    elif flag == "U":
+                        sort = "none"
+                    elif flag == "S":
+                        sort = "size"
+                    elif flag == "t":
+                        sort = "time"
+                    else:
+                        raise ValueError(f"Неизвестный флаг: -{flag}")
             else:
                 target_arg = a
 
@@ -40,11 +94,88 @@ class Ls(Command):
             raise FileNotFoundError("Нет такого файла или каталога")
 
         if target.is_file():
-            print(format_long(target) if long else target.name)
+            out.write(format_long(target) if long else target.name)
             return None
 
-        entries = sorted(target.iterdir(), key=lambda p: p.name.lower())  # .iterdir - содержимое каталога
-        for p in entries:
-            print(format_long(p) if long else p.name)
+        cache = get_cache(env)
+        need_stat = long or sort in ("size", "time")
+        pool = ThreadPoolExecutor(max_workers=workers) if workers and need_stat else None
+        try:
+            if not recursive:
+                self._list_dir(target, out, long, sort, pool, cache=cache)
+                return None
+
+            stack = [target]
+            first = True
+            while stack:
+                directory = stack.pop()
+                if not first:
+                    out.write()
+                first = False
+                out.write(f"{directory}:")
+                try:
+                    subdirs = self._list_dir(
+                        directory, out, long, sort, pool, recursive=True, cache=cache
+                    )
+                except OSError as e:
+                    out.write(f"Не удалось прочитать {directory}: {e}")
+                    continue
+                stack.extend(reversed(subdirs))  # обходим в глубину в порядке вывода
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        return None
+
+    def _list_dir(
+        self, target, out, long: bool, sort: str, pool, recursive: bool = False, cache=None
+    ) -> list[Path]:
+        """
+        Выводит один каталог и (при recursive) возвращает его подкаталоги в порядке вывода
+
+        Список записей берётся из кэша сеанса, если он есть; режим -U кэш не использует,
+        потому что нужен как раз для огромных каталогов, которые не стоит копить в памяти
+
+        С пулом потоков stat всех записей запрашиваются параллельно, а вывод идёт
+        в том же порядке, что и без пула
+        """
+        subdirs = []
+
+        def emit(entry) -> None:
+            out.write(format_long(entry, entry_stat(entry)) if long else entry.name)
+            if recursive and entry.is_dir(follow_symlinks=False):
+                subdirs.append(Path(entry.path))
+
+        if cache is not None and sort != "none":
+            entries = cache.listdir(target)
+            return self._emit_sorted(entries, sort, pool, emit, subdirs)
+
+        with os.scandir(target) as it:
+            if sort == "none":
+                if pool is None:
+                    for entry in it:  # ничего не копим: выводим по мере чтения
+                        emit(entry)
+                    return subdirs
+                while batch := list(islice(it, STAT_BATCH)):
+                    list(pool.map(entry_stat, batch))  # stat кэшируется в DirEntry
+                    for entry in batch:
+                        emit(entry)
+                return subdirs
+            entries = list(it)
+        return self._emit_sorted(entries, sort, pool, emit, subdirs)
+
+    @staticmethod
+    def _emit_sorted(entries: list, sort: str, pool, emit, subdirs: list[Path]) -> list[Path]:
+        if pool is not None:
+            list(pool.map(entry_stat, entries))
+
+        if sort == "size":
+            entries.sort(key=lambda e: (-entry_stat(e).st_size, e.name.lower()))
+        elif sort == "time":
+            entries.sort(key=lambda e: (-entry_stat(e).st_mtime, e.name.lower()))
+        else:
+            entries.sort(key=lambda e: e.name.lower())
 
-        return None
\ No newline at end of file
+        for entry in entries:
+            emit(entry)
+        return subdirs
@@ -1,9 +1,104 @@
+import errno
+import os
 import shutil
 
 from pathlib import Path
 
 from src.commands.base import Command
+from src.commands.builtin_cp import copy_tree, needs_copy
+from src.dircache import invalidate
+from src.fastcopy import copy_file
+from src.journal import Change, record
 from src.paths import to_path
+from src.util import positive_int
+from src.walk import walk_files
+
+
+# сколько потоков копируют файлы при перемещении между файловыми системами
+MOVE_WORKERS = 4
+
+# суффикс временной копии рядом с назначением
+PART_SUFFIX = ".mvpart"
+
+# суффикс отметки о том, до какого шага дошло перемещение после копирования
+STATE_SUFFIX = ".mvstate"
+
+
+def tree_sizes(root: Path) -> dict[str, int]:
+    """Размеры обычных файлов дерева по относительным путям"""
+    if not root.is_dir() or root.is_symlink():
+        return {"": root.lstat().st_size} if root.is_file() else {}
+    return {rel: entry.stat(follow_symlinks=False).st_size for rel, entry in walk_files(root)}
+
+
+def move_phase(src: Path, dst: Path) -> str | None:
+    """
+    Шаг прерванного перемещения src в dst по отметке <dst>.mvstate
+
+    copied — копия сверена, но ещё не переименована в dst (или переименована,
+    а отметка не обновлена); removing — dst на месте, удаляется источник.
+    None — отметки нет или она осталась от перемещения другого источника
+    """
+    state = dst.with_name(dst.name + STATE_SUFFIX)
+    try:
+        phase, _, source = state.read_text(encoding="utf-8").partition("\n")
+    except OSError:
+        return None
+    return phase if source.rstrip("\n") == str(src) else None
+
+
+def move_across(src: Path, dst: Path, workers: int) -> None:
+    """
+    Перемещение на другую файловую систему: копия, проверка, удаление источника
+
+    Копия собирается рядом с назначением под именем <dst>.mvpart и переименовывается
+    в dst только после сверки размеров всех файлов. Если перемещение прервали,
+    повторный запуск докопирует в .mvpart только недостающие и изменившиеся файлы
+    и удалит из него то, чего в источнике уже нет. После сверки шаг записывается
+    в <dst>.mvstate, и прерванное удаление источника продолжается, а не
+    начинается заново копированием его остатка
+    """
+    part = dst.with_name(dst.name + PART_SUFFIX)
+    state = dst.with_name(dst.name + STATE_SUFFIX)
+    phase = move_phase(src, dst)
+
+    if phase is None:
+        if src.is_symlink():
+            if part.is_symlink() or part.exists():
+                part.unlink()
+            os.symlink(os.readlink(src), part)
+        elif src.is_dir():
+            copy_tree(src, part, workers=workers, compare="update", delete=True)
+        elif needs_copy(str(src), src.stat(), part, "update"):
+            copy_file(src, part)
+
+        if tree_sizes(src) != tree_sizes(part):
+            raise OSError(f"Копия {part} не совпадает с источником, источник не удалён")
+        state.write_text(f"copied\n{src}\n", encoding="utf-8")
+        phase = "copied"
+
+    if phase == "copied":
+        if part.is_symlink() or part.exists():  # иначе прервали уже после переименования
+            os.rename(part, dst)  # та же файловая система, что у dst
+        state.write_text(f"removing\n{src}\n", encoding="utf-8")
+
+    if src.is_dir() and not src.is_symlink():
+        shutil.rmtree(src)
+    elif src.is_symlink() or src.exists():
+        src.unlink()
+    state.unlink()
+
+
+def move(src: Path, dst: Path, workers: int = MOVE_WORKERS) -> None:
+    """Переименование, а если источник на другой файловой системе — move_across"""
+    if move_phase(src, dst) is None:
+        try:
+            os.rename(src, dst)
+            return
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+    move_across(src, dst, workers)
 
 
 class Mv(Command):
@@ -12,37 +107,75 @@ class Mv(Command):
     """
 
     name = "mv"
-    help = "mv <source> <destination>"
+    help = "mv [-j N] <source> [source ...] <destination>"
     description = (
         "Перемещает или переименовывает файл или каталог\n\
         Если destination каталог,то объект будет перемещён внутрь него\n\
         Если destination имя файла, то объект переименуется\n\
+        Несколько источников перемещаются в существующий каталог\n\
+        Между файловыми системами данные копируются в N потоков (-j, по умолчанию 4)\n\
+        во временный <имя>.mvpart; источник удаляется только после сверки размеров,\n\
+        а прерванное перемещение (и удаление источника) при повторном запуске\n\
+        продолжается с того же шага\n\
         Примеры:\n\
             mv oldd.txt new.txt\n\
-            mv dir_1/ dir_2/\n"
+            mv dir_1/ dir_2/\n\
+            mv a.txt b.txt docs/\n"
     )
 
     def run(self, args: list[str], cwd: Path, env: dict) -> None:
-        if len(args) != 2:
+        workers = MOVE_WORKERS
+        rest = []
+        it = iter(args)
+        for a in it:
+            if a == "-j" or (a.startswith("-j") and a[2:].isdigit()):
+                workers = positive_int(a[2:] or next(it, ""), "-j")
+            else:
+                rest.append(a)
+        args = rest
+
+        if len(args) < 2:
             hint = ""
             if any(" " in a for a in args):
                 hint = (
                     '\nПодсказка: если в пути есть пробелы, используйте для этого пути ковычки'
                 )
             raise ValueError(
-                f"Ожидается 2 аргумента: mv <source> <destination>"
+                f"Ожидается минимум 2 аргумента: mv <source> [source ...] <destination>"
                 f"Получено: {len(args)}.{hint}"
             )
 
-        src = to_path(args[0], cwd)
-        dst = to_path(args[1], cwd)
+        sources = [to_path(a, cwd) for a in args[:-1]]
+        dst = to_path(args[-1], cwd)
 
-        if not src.exists():
-            raise FileNotFoundError("Источник не существует")
+        targets = []
+        for src in sources:
+            # dst уже создан прерванным перемещением: продолжаем в него, а не внутрь него
+            target = dst / src.name if dst.is_dir() and move_phase(src, dst) is None else dst
+            resumed = move_phase(src, target) is not None
+            if not src.exists() and not src.is_symlink() and not resumed:
+                raise FileNotFoundError(f"Источник не существует: {src}")
+            targets.append((src, target, resumed))
+        if len(sources) > 1 and not dst.is_dir():
+            raise NotADirectoryError("При нескольких источниках назначение должно быть каталогом")
 
+        change = Change("mv")
         try:
-            shutil.move(src, dst)
-        except PermissionError:
-            raise PermissionError("Недостаточно прав для перемещения")
-        except FileNotFoundError:
-            raise FileNotFoundError("Путь назначения не существует")
\ No newline at end of file
+            for src, target, resumed in targets:
+                if src == target:
+                    continue
+                if src.is_dir() and src in target.parents:
+                    raise ValueError("Нельзя переместить каталог внутрь самого себя")
+                try:
+                    if not resumed and not src.is_dir() and (target.is_symlink() or target.is_file()):
+                        change.backup(target)  # перезаписываемый файл можно будет вернуть
+                    move(src, target, workers)
+                    change.move(src, target)
+                except PermissionError:
+                    raise PermissionError("Недостаточно прав для перемещения")
+                except FileNotFoundError:
+                    raise FileNotFoundError("Путь назначения не существует")
+                finally:
+                    invalidate(env, src, target)
+        finally:
+            record(change, env)
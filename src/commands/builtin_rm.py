@@ -1,73 +1,92 @@
-import shutil
 from pathlib import Path
 from src.commands.base import Command
+from src.dircache import invalidate
+from src.output import get_output
+from src.journal import Change, record
 from src.paths import to_path
 
 
-TRASH_DIR = Path("src/data/.trash")
-TRASH_DIR.mkdir(parents=True, exist_ok=True)
-
-
 class Rm(Command):
     """
     Удаление файлов и каталогов
     """
 
     name = "rm"
-    help = "rm [-r] <path>"
+    help = "rm [-r] [-f] <path> [path ...]"
     description = (
-        "Удаляет указанный файл или каталог\n\
+        "Удаляет указанные файлы и каталоги\n\
         Поддерживает:\n\
             -r — рекурсивное удаление каталогов с их содержимым\n\
-        Требует подтверждения при удалении каталогов\n\
+            -f — удалять каталоги без подтверждения\n\
+        Требует подтверждения при удалении каталогов; в сценарии (run-script)\n\
+        вопросов нет, и каталог удаляется только с -f\n\
+        Объект не удаляется, а переименовывается в корзину на той же файловой\n\
+        системе, поэтому rm работает мгновенно при любом размере;\n\
+        вернуть его можно через undo или trash restore\n\
         Ограничения:\n\
             - нельзя удалить корень '/'\n\
             - нельзя удалить родительский каталог '..'\n\
         Примеры:\n\
             rm file.txt\n\
-            rm -r old_folder/\n"
+            rm -r old_folder/\n\
+            rm -rf build/\n\
+            rm *.tmp\n"
     )
 
     def run(self, args: list[str], cwd: Path, env: dict) -> None:
+        recursive = force = False
+        paths = []
+        for a in args:
+            if a in ("-r", "-f", "-rf", "-fr"):
+                recursive = recursive or "r" in a
+                force = force or "f" in a
+            else:
+                paths.append(a)
+        args = paths
+
         if not args:
             raise ValueError("Нужно указать путь для удаления")
 
-        recursive = False
-        if "-r" in args:
-            recursive = True
-            args = [a for a in args if a != "-r"]
-
-        if len(args) != 1:
-            raise ValueError("Ожидается один путь")
+        targets = [to_path(a, cwd) for a in args]
+        for target in targets:  # проверяем все пути до удаления первого
+            # Как указано в условиях
+            if target.name in ("/", ".."):
+                raise PermissionError("Удаление этого каталога запрещено")
+            if not target.exists():
+                raise FileNotFoundError(f"Файл или каталог не существует: {target}")
 
-        target = to_path(args[0], cwd)
-
-        # Как указано в условиях 
-        if target.name in ("/", ".."):
-            raise PermissionError("Удаление этого каталога запрещено")
-
-        if not target.exists():
-            raise FileNotFoundError("Файл или каталог не существует")
-        
+        # все удалённые одной командой возвращаются одним undo
+        change = Change("rm")
         try:
-            trash_target = TRASH_DIR / target.name
+            for target in targets:
+                self._remove(target, recursive, force, change, env)
+        finally:
+            record(change, env)
 
+    @staticmethod
+    def _remove(target: Path, recursive: bool, force: bool, change: Change, env: dict) -> None:
+        out = get_output(env)
+        try:
             if target.is_dir():
                 if not recursive:
                     raise IsADirectoryError(
                         "Указан каталог, чтобы его рекурсивно удалить используйте флаг -r"
                     )
 
-                confirm = input(f"Вы уверены, что хотите удалить {target}? (y/n): ")
-                if confirm.lower() != "y":
-                    print("Удаление отменено")
-                    return
+                if not force:
+                    if not env.get("interactive", True):
+                        # input() в сценарии прочитал бы как ответ следующую его строку
+                        raise ValueError(f"В сценарии каталог {target} удаляется только с -f")
+                    out.flush()  # вопрос должен появиться после уже выведенного
+                    confirm = input(f"Вы уверены, что хотите удалить {target}? (y/n): ")
+                    if confirm.lower() != "y":
+                        out.write("Удаление отменено")
+                        return
 
-            # перемещаем в .trash вместо удаления
-            shutil.move(str(target), str(trash_target))
-            print(f"{target} перемещён в корзину (.trash)")
+            # перемещаем в корзину вместо удаления
+            item = change.backup(target)
+            invalidate(env, target, Path(item.location))
+            out.write(f"{target} перемещён в корзину (id {item.id})")
 
         except PermissionError:
             raise PermissionError("Недостаточно прав для удаления")
-        except Exception as e:
-            print(f"Ошибка при удалении: {e}")
\ No newline at end of file
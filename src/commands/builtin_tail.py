@@ -0,0 +1,157 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import sys
+import threading
+import time
+from collections import deque
+from collections.abc import Iterator
+from pathlib import Path
+from typing import BinaryIO
+
+from src.commands.base import Command
+from src.commands.builtin_head import check_file, parse_lines_arg
+from src.output import Output, get_output
+from src.paths import to_path
+from src.util import BLOCK_SIZE, tail_offset
+
+# как часто проверять файл без inotify (и как часто проверять флаг остановки)
+POLL_INTERVAL = 0.5
+
+# события inotify: запись в файл, смена атрибутов (truncate), удаление и переименование
+IN_MODIFY = 0x002
+IN_ATTRIB = 0x004
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+
+
+class Inotify:
+    """
+    Минимальная обёртка над inotify через ctypes (только Linux)
+
+    Если inotify недоступен, конструктор бросает OSError и вызывающий код
+    переходит на периодическую проверку размера файла
+    """
+
+    def __init__(self, path: Path):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify есть только в Linux")
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        mask = IN_MODIFY | IN_ATTRIB | IN_DELETE_SELF | IN_MOVE_SELF
+        if libc.inotify_add_watch(self.fd, os.fsencode(path), mask) < 0:
+            err = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(err, "inotify_add_watch")
+
+    def wait(self, timeout: float) -> None:
+        """Ждёт событие или таймаут; сами события не разбираются — после них файл перечитывается"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if ready:
+            try:
+                while os.read(self.fd, 4096):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class Poller:
+    """Запасной вариант без inotify: просто пауза между проверками"""
+
+    def wait(self, timeout: float) -> None:
+        time.sleep(timeout)
+
+    def close(self) -> None:
+        pass
+
+
+def follow(
+    f: BinaryIO,
+    path: Path,
+    out: Output,
+    stop: threading.Event | None = None,
+    interval: float = POLL_INTERVAL,
+) -> None:
+    """
+    Выводит данные, дописанные в файл, пока не установлен stop (или до Ctrl+C)
+
+    Читается только новое содержимое с текущей позиции; при усечении файла
+    чтение начинается сначала
+    """
+    try:
+        watcher: Inotify | Poller = Inotify(path)
+    except OSError:
+        watcher = Poller()
+
+    try:
+        while stop is None or not stop.is_set():
+            chunk = f.read(BLOCK_SIZE)
+            if chunk:
+                out.write_bytes(chunk)
+                continue
+            if os.fstat(f.fileno()).st_size < f.tell():
+                out.write(f"tail: файл {path.name} усечён")
+                f.seek(0)
+                continue
+            watcher.wait(interval)
+    finally:
+        watcher.close()
+
+
+class Tail(Command):
+    """
+    Последние строки файла
+    """
+
+    name = "tail"
+    help = "tail [-n N] [-f] <file>"
+    description = (
+        "Показывает последние N строк файла (по умолчанию 10)\n\
+        Файл читается блоками с конца, поэтому размер файла не важен\n\
+        Поддерживает:\n\
+            -f — после вывода ждать и показывать новые строки (Ctrl+C — выход);\n\
+                 в Linux используется inotify, иначе периодическая проверка\n\
+        В конвейере оставляет последние N строк предыдущей команды\n\
+        Пример:\n\
+            tail -n 50 -f shell.log"
+    )
+
+    def run(self, args: list[str], cwd: Path, env: dict) -> None:
+        out = get_output(env)
+        follow_mode = "-f" in args
+        args = [a for a in args if a != "-f"]
+        n, rest = parse_lines_arg(args, self.help)
+        target = to_path(rest[0], cwd)
+        check_file(target)
+
+        with open(target, "rb") as f:
+            f.seek(tail_offset(f, n))
+            while chunk := f.read(BLOCK_SIZE):
+                out.write_bytes(chunk)
+
+            if follow_mode:
+                out.flush()
+                try:
+                    follow(f, target, out)
+                except KeyboardInterrupt:
+                    pass
+
+    def stream(self, args: list[str], cwd: Path, env: dict, stdin: Iterator[str] | None = None) -> Iterator[str]:
+        if "-f" in args:
+            raise ValueError("tail -f нельзя использовать в конвейере")
+        n, rest = parse_lines_arg(args, self.help, need_file=stdin is None)
+        if not rest:
+            yield from deque(stdin, maxlen=n)  # в памяти только последние n строк
+            return
+        target = to_path(rest[0], cwd)
+        check_file(target)
+        with open(target, "rb") as f:
+            f.seek(tail_offset(f, n))
+            for line in f:
+                yield line.decode("utf-8", errors="replace").rstrip("\r\n")
@@ -1,8 +1,86 @@
+import os
+import posixpath
 import tarfile
 
 from pathlib import Path
 from src.commands.base import Command
+from src.fastcopy import data_ranges, is_sparse
+from src.output import get_output
 from src.paths import to_path
+from src.walk import split_excludes, walk
+
+
+class SparseReader:
+    """
+    Данные члена архива в формате GNU sparse 1.0: карта участков, выровненная
+    до блока tar, и затем подряд только участки с данными (без дыр)
+    """
+
+    def __init__(self, f, ranges: list[tuple[int, int]], header: bytes):
+        self.f = f
+        self.header = header
+        self.ranges = iter(ranges)
+        self.left = 0
+
+    def read(self, n: int) -> bytes:
+        # tarfile ждёт ровно n байт за вызов, поэтому куски склеиваются
+        parts = []
+        while n:
+            chunk = self._read_some(n)
+            if not chunk:
+                break
+            parts.append(chunk)
+            n -= len(chunk)
+        return b"".join(parts)
+
+    def _read_some(self, n: int) -> bytes:
+        if self.header:
+            chunk, self.header = self.header[:n], self.header[n:]
+            return chunk
+        while not self.left:
+            offset, length = next(self.ranges, (None, 0))
+            if offset is None:
+                return b""
+            self.f.seek(offset)
+            self.left = length
+        data = self.f.read(min(n, self.left))
+        if not data:
+            raise OSError("Файл укоротился во время архивации")
+        self.left -= len(data)
+        return data
+
+
+def add_sparse(tarf: tarfile.TarFile, path: str, arcname: str) -> bool:
+    """
+    Добавляет разреженный файл как член GNU sparse 1.0 (PAX), дыры не записываются
+
+    tarfile сам так писать не умеет, но умеет читать и при распаковке
+    восстанавливает дыры. Возвращает False для жёсткой ссылки на уже добавленный файл
+    """
+    info = tarf.gettarinfo(path, arcname)
+    if not info.isreg():
+        return False
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        ranges = list(data_ranges(f.fileno(), st.st_size))
+        if not ranges or sum(ranges[-1]) < st.st_size:
+            ranges.append((st.st_size, 0))  # как в GNU tar: карта доходит до конца файла
+
+        lines = [str(len(ranges))] + [f"{n}" for r in ranges for n in r]
+        header = ("\n".join(lines) + "\n").encode("ascii")
+        header += b"\0" * (-len(header) % tarfile.BLOCKSIZE)
+
+        head, tail = posixpath.split(arcname)
+        info.name = posixpath.join(head, "GNUSparseFile.0", tail)
+        info.size = len(header) + sum(length for _, length in ranges)
+        info.pax_headers = {
+            "GNU.sparse.major": "1",
+            "GNU.sparse.minor": "0",
+            "GNU.sparse.name": arcname,
+            "GNU.sparse.realsize": str(st.st_size),
+        }
+        tarf.addfile(info, SparseReader(f, ranges, header))
+    return True
 
 
 class Tar(Command):
@@ -11,16 +89,22 @@ class Tar(Command):
     """
 
     name = "tar"
-    help = "tar <folder> <archive.tar.gz>"
+    help = "tar [--exclude GLOB] <folder> <archive.tar.gz>"
     description = (
         "Создаёт архив TAR.GZ из указанного каталога\n\
+        Разреженные файлы (образы дисков, файлы БД) сохраняются без дыр\n\
+        в формате GNU sparse, при распаковке дыры восстанавливаются\n\
+        Поддерживает:\n\
+            --exclude GLOB — не добавлять файлы и каталоги по шаблону\n\
         Пример:\n\
             tar src archive.tar.gz"
     )
 
     def run(self, args: list[str], cwd: Path, env: dict) -> None:
+        out = get_output(env)
+        args, exclude = split_excludes(args)
         if len(args) != 2:
-            raise ValueError("Использование: tar <папка> <архив.tar.gz>")
+            raise ValueError("Использование: tar [--exclude GLOB] <папка> <архив.tar.gz>")
 
         folder = to_path(args[0], cwd)
         archive = to_path(args[1], cwd)
@@ -28,6 +112,17 @@ class Tar(Command):
         if not folder.exists() or not folder.is_dir():
             raise FileNotFoundError("Указанный путь не является каталогом")
 
-        with tarfile.open(archive, "w:gz") as tarf:
-            tarf.add(folder, arcname=folder.name)
-        print(f"Архив {archive} успешно создан")
\ No newline at end of file
+        with tarfile.open(archive, "w:gz", format=tarfile.PAX_FORMAT) as tarf:
+            tarf.add(folder, arcname=folder.name, recursive=False)
+            for rel, entry in walk(folder, exclude):
+                if entry.path == str(archive):
+                    continue  # архив может создаваться внутри архивируемой папки
+                arcname = f"{folder.name}/{rel}"
+                if (
+                    entry.is_file(follow_symlinks=False)
+                    and is_sparse(entry.stat(follow_symlinks=False))
+                    and add_sparse(tarf, entry.path, arcname)
+                ):
+                    continue
+                tarf.add(entry.path, arcname=arcname, recursive=False)
+        out.write(f"Архив {archive} успешно создан")
\ No newline at end of file
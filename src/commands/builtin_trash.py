@@ -0,0 +1,116 @@
+import time
+from pathlib import Path
+
+from src import journal, trash
+from src.commands.base import Command
+from src.dircache import invalidate
+from src.output import get_output
+from src.paths import to_path
+from src.util import human_size
+
+
+class TrashCmd(Command):
+    """
+    Просмотр корзины и восстановление удалённого
+    """
+
+    name = "trash"
+    help = (
+        "trash list | trash restore <id|path> [destination] | "
+        "trash purge [--older-than D] [--max-size S] [--force] [--background | --stop]"
+    )
+    description = (
+        "Работа с корзиной, куда rm переносит удалённое\n\
+        У каждой файловой системы своя корзина, а общий индекс хранит исходный\n\
+        путь, время удаления и размер, поэтому корзины не приходится просматривать\n\
+        Поддерживает:\n\
+            list — список удалённого: id, время, размер, исходный путь\n\
+            restore <id|path> [destination] — вернуть объект на место или в destination;\n\
+                по пути восстанавливается последний удалённый с этим путём\n\
+            purge — окончательно удалить содержимое корзины, начиная со старого:\n\
+                --older-than D — всё, что лежит дольше D (30m, 12h, 7d)\n\
+                --max-size S — старое, пока корзина не уложится в S (500M, 10G)\n\
+                без условий корзина очищается целиком\n\
+                то, что ещё может вернуть undo (есть в журнале), не удаляется;\n\
+                --force — удалить и это (undo таких операций станет невозможен)\n\
+                --background — не удалять сейчас, а проверять корзину каждые 10 минут\n\
+                  в фоновом потоке до конца сеанса, с ограниченной скоростью удаления\n\
+                --stop — остановить фоновую очистку\n\
+        Большие деревья удаляются в несколько потоков\n"
+    )
+
+    def run(self, args: list[str], cwd: Path, env: dict) -> None:
+        out = get_output(env)
+        if not args:
+            raise ValueError(f"Использование: {self.help}")
+        action, *rest = args
+
+        if action == "list" and not rest:
+            items = trash.load_index()
+            if not items:
+                out.write("Корзина пуста")
+                return
+            for item in items.values():
+                when = time.strftime("%Y-%m-%d %H:%M", time.localtime(item.deleted))
+                kind = "/" if item.is_dir else ""
+                out.write(f"{item.id}  {when}  {human_size(trash.item_size(item)):>7}  {item.path}{kind}")
+
+        elif action == "restore" and rest and len(rest) <= 2:
+            item = trash.find(rest[0]) or trash.find(str(to_path(rest[0], cwd)))
+            if item is None:
+                raise FileNotFoundError("В корзине нет такого объекта")
+            dest = to_path(rest[1], cwd) if len(rest) == 2 else None
+            restored = trash.restore(item, dest)
+            invalidate(env, restored, Path(item.location))
+            out.write(f"Восстановлен: {restored}")
+
+        elif action == "purge":
+            self._purge(rest, env, out)
+
+        else:
+            raise ValueError(f"Использование: {self.help}")
+
+    def _purge(self, args: list[str], env: dict, out) -> None:
+        older_than = None
+        max_size = None
+        background = False
+        force = False
+        it = iter(args)
+        for a in it:
+            if a == "--older-than":
+                older_than = trash.parse_duration(next(it, ""))
+            elif a == "--max-size":
+                max_size = trash.parse_size(next(it, ""))
+            elif a == "--background":
+                background = True
+            elif a == "--force":
+                force = True
+            elif a == "--stop":
+                purger = env.pop("purger", None)
+                if purger is None:
+                    out.write("Фоновая очистка не запущена")
+                else:
+                    purger.stop()
+                    out.write("Фоновая очистка остановлена")
+                return
+            else:
+                raise ValueError(f"Неизвестный аргумент: {a}")
+
+        if background:
+            if older_than is None and max_size is None:
+                raise ValueError("Для фоновой очистки укажите --older-than или --max-size")
+            old = env.pop("purger", None)
+            if old is not None:
+                old.stop()
+            env["purger"] = trash.Purger(older_than, max_size, keep=None if force else journal.trash_ids)
+            env["purger"].start()
+            out.write("Фоновая очистка корзины запущена")
+            return
+
+        result = trash.purge(older_than, max_size, keep=frozenset() if force else journal.trash_ids())
+        out.write(f"Удалено из корзины: {result.count}, освобождено {human_size(result.freed)}")
+        if result.kept:
+            out.write(
+                f"Не тронуто объектов: {result.kept} — их ещё может вернуть undo "
+                f"(--force удалит и их)"
+            )
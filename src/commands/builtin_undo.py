@@ -2,71 +2,144 @@ import shutil
 
 from pathlib import Path
 from src.commands.base import Command
+from src.commands.builtin_mv import move
+from src.dircache import invalidate
+from src.output import get_output
+from src.util import positive_int
+from src import journal, trash
 
 
-HISTORY_FILE = Path("src/data/.history")
-TRASH_DIR = Path("src/data/.trash")
-TRASH_DIR.mkdir(parents=True, exist_ok=True)
+def remove_created(path: Path) -> None:
+    if path.is_dir() and not path.is_symlink():
+        shutil.rmtree(path)
+    elif path.exists() or path.is_symlink():
+        path.unlink()
+
+
+class CannotRevert(Exception):
+    """Операцию уже нельзя отменить: её данных больше нет (корзину очистили и т.п.)"""
+
+
+def check_revertible(entry: dict, items: dict[str, trash.TrashItem]) -> None:
+    """
+    Проверяет до любых изменений, что операцию можно отменить целиком
+
+    CannotRevert — нужного для отмены больше нет; FileExistsError — путь,
+    куда нужно вернуть объект, занят чем-то, чего операция не создавала
+    """
+    created = [Path(p) for p in entry.get("created", [])]
+
+    def occupied(path: Path) -> bool:
+        if not path.exists() and not path.is_symlink():
+            return False
+        return not any(path == c or c in path.parents for c in created)  # созданное удалится
+
+    for src, dst in entry.get("moved", []):
+        if not Path(dst).exists() and not Path(dst).is_symlink():
+            raise CannotRevert(f"не найден перемещённый объект: {dst}")
+        if occupied(Path(src)):
+            raise FileExistsError(f"Путь уже занят: {src}")
+
+    for path, item_id in entry.get("trashed", []):
+        item = items.get(item_id)
+        if item is None or not (Path(item.location).exists() or Path(item.location).is_symlink()):
+            raise CannotRevert(f"в корзине больше нет {path} (id {item_id})")
+        if occupied(Path(path)):
+            raise FileExistsError(f"Путь уже занят: {path}")
+
+
+def revert(entry: dict, env: dict) -> None:
+    """
+    Отменяет одну операцию журнала в обратном порядке: удаляет созданное,
+    возвращает перемещённое и восстанавливает из корзины удалённое и перезаписанное
+
+    Сначала проверяется, что отмена возможна целиком (check_revertible),
+    чтобы не оставить операцию отменённой наполовину
+    """
+    items = trash.load_index()
+    check_revertible(entry, items)
+
+    touched = []
+    for path in reversed(entry.get("created", [])):
+        remove_created(Path(path))
+        touched.append(Path(path))
+
+    for src, dst in reversed(entry.get("moved", [])):
+        src, dst = Path(src), Path(dst)
+        src.parent.mkdir(parents=True, exist_ok=True)
+        move(dst, src)
+        touched += [src, dst]
+
+    for path, item_id in reversed(entry.get("trashed", [])):
+        item = items[item_id]
+        trash.restore(item, Path(path))
+        touched += [Path(path), Path(item.location)]
+
+    invalidate(env, *touched)
 
 
 class Undo(Command):
     """
-    Отмена последней операции cp, mv или rm
+    Отмена последних операций cp, mv, rm, unzip и untar
     """
 
     name = "undo"
-    help = "undo"
+    help = "undo [N]"
     description = (
-        "Отменяет последнюю команду из списка cp, mv или rm\n\
-        Для cp: удаляет скопированный файл\n\
+        "Отменяет последнюю (или N последних) операцию из cp, mv, rm, unzip, untar\n\
+        Операции берутся из журнала, где хранятся абсолютные пути созданного,\n\
+        перемещённого и удалённого, поэтому пути с пробелами не мешают\n\
+        Для cp, unzip, untar: удаляет созданное и возвращает перезаписанное\n\
         Для mv: возвращает на исходное место\n\
-        Для rm: восстанавливает из корзины (.trash)"
+        Для rm: восстанавливает из корзины\n\
+        Операции завершённой транзакции (begin ... commit) отменяются вместе"
     )
 
     def run(self, args: list[str], cwd: Path, env: dict) -> None:
-        if not HISTORY_FILE.exists():
-            print("История пуста")
-            return
-
-        lines = HISTORY_FILE.read_text(encoding="utf-8").splitlines()
-        if not lines:
-            print("История пуста")
-            return
-
-        last = lines[-1]
-        print(f"Отменяется: {last}")
-
-        parts = last.split()
-        if not parts:
-            print("Невозможно отменить пустую команду")
-            return
-
-        cmd, *rest = parts
-        try:
-            if cmd == "cp" and len(rest) >= 2:
-                dst = Path(rest[-1])
-                if dst.exists():
-                    if dst.is_dir():
-                        shutil.rmtree(dst)  # удаляем рекурсивно каталог
-                    else:
-                        dst.unlink()  # удаляем файл
-                    print(f"Удалён {dst}")
-
-            elif cmd == "mv" and len(rest) >= 2:
-                src, dst = Path(rest[0]), Path(rest[-1])
-                if dst.exists():
-                    shutil.move(dst, src)  # просто перемещаем обратно
-                    print(f"Файл возвращён: {dst} → {src}")
-
-            elif cmd == "rm" and len(rest) >= 1:
-                name = Path(rest[0]).name
-                trash_item = TRASH_DIR / name
-                if trash_item.exists():
-                    shutil.move(trash_item, cwd / name)
-                    print(f"Восстановлен: {name}")
+        out = get_output(env)
+        if len(args) > 1:
+            raise ValueError(f"Использование: {self.help}")
+        count = positive_int(args[0], "undo") if args else 1
 
+        for _ in range(count):
+            last = journal.last()
+            if last is None:
+                out.write("Нечего отменять")
+                return
+            txn = last[1].get("txn")
+            active = env.get("txn")
+            if txn is None or (active is not None and active["id"] == txn):
+                undo_last(env, out)
             else:
-                print("Эту команду нельзя отменить")
+                # транзакция отменяется целиком, как одна операция
+                rollback_txn(txn, env, out)
+
+
+def undo_last(env: dict, out) -> bool:
+    """Отменяет последнюю запись журнала; False, если журнал пуст"""
+    last = journal.last()
+    if last is None:
+        return False
+    offset, entry = last
+    line = entry.get("line", entry.get("op"))
+    out.write(f"Отменяется: {line}")
+    try:
+        revert(entry, env)
+    except CannotRevert as e:
+        # ничего не изменено; запись снимается, иначе она заблокирует отмену более ранних
+        journal.drop(offset)
+        out.write(f"Операцию «{line}» отменить нельзя: {e}. Запись убрана из журнала")
+        return True
+    journal.drop(offset)  # запись снимается только после успешной отмены
+    return True
+
 
-        except Exception as e:
-            print(f"Ошибка при отмене: {e}")
\ No newline at end of file
+def rollback_txn(txn_id: str, env: dict, out) -> int:
+    """Отменяет с конца журнала все подряд идущие операции транзакции txn_id"""
+    undone = 0
+    while True:
+        last = journal.last()
+        if last is None or last[1].get("txn") != txn_id:
+            return undone
+        undo_last(env, out)
+        undone += 1
@@ -1,9 +1,26 @@
 import tarfile
 from pathlib import Path
 from src.commands.base import Command
+from src.dircache import invalidate
+from src.commands.builtin_unzip import prepare_extract
+from src.journal import Change, record
+from src.output import get_output
 from src.paths import to_path
 
 
+def tar_destination(cwd: Path, member: tarfile.TarInfo) -> Path:
+    """
+    Куда запись будет извлечена фильтром "data": он убирает ведущий '/'
+    и отклоняет записи и ссылки, выходящие за пределы каталога
+    """
+    if hasattr(tarfile, "data_filter"):
+        try:
+            member = tarfile.data_filter(member, str(cwd))
+        except tarfile.FilterError as e:
+            raise ValueError(f"Небезопасная запись в архиве: {e}")
+    return cwd / member.name
+
+
 class Untar(Command):
     """
     Распаковка TAR.GZ архива
@@ -18,6 +35,7 @@ class Untar(Command):
     )
 
     def run(self, args: list[str], cwd: Path, env: dict) -> None:
+        out = get_output(env)
         if len(args) != 1:
             raise ValueError("Использование: untar <архив.tar.gz>")
 
@@ -25,6 +43,16 @@ class Untar(Command):
         if not archive.exists():
             raise FileNotFoundError("Архив не найден")
 
-        with tarfile.open(archive, "r:gz") as tarf:
-            tarf.extractall(cwd)
-        print(f"Архив {archive.name} успешно распакован в {cwd}")
\ No newline at end of file
+        change = Change("untar")
+        try:
+            with tarfile.open(archive, "r:gz") as tarf:
+                targets = [tar_destination(cwd, member) for member in tarf.getmembers()]
+                prepare_extract(change, cwd, targets)
+                if hasattr(tarfile, "data_filter"):
+                    tarf.extractall(cwd, filter="data")
+                else:
+                    tarf.extractall(cwd)
+        finally:
+            record(change, env)
+            invalidate(env, cwd)
+        out.write(f"Архив {archive.name} успешно распакован в {cwd}")
\ No newline at end of file
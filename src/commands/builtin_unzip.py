@@ -1,10 +1,45 @@
+import os
 import zipfile
 
 from pathlib import Path
 from src.commands.base import Command
+from src.dircache import invalidate
+from src.journal import Change, record
+from src.output import get_output
 from src.paths import to_path
 
 
+def zip_destination(cwd: Path, name: str) -> Path:
+    """Куда zipfile на самом деле извлечёт запись: без диска, корня и компонентов '..'"""
+    arcname = os.path.splitdrive(name.replace("/", os.sep))[1]
+    parts = [p for p in arcname.split(os.sep) if p not in ("", os.curdir, os.pardir)]
+    return cwd.joinpath(*parts)
+
+
+def prepare_extract(change: Change, cwd: Path, targets: list[Path]) -> None:
+    """
+    Записывает для undo, что создаст распаковка: новые пути запоминаются,
+    а файлы, которые будут перезаписаны, переносятся в корзину
+
+    targets — пути, куда распаковщик запишет записи архива. Если хоть один
+    из них (в том числе через символьную ссылку в cwd) выходит за пределы cwd,
+    распаковка отменяется до каких-либо изменений
+    """
+    root = cwd.resolve()
+    for path in targets:
+        real = Path(os.path.realpath(path.parent)) / path.name
+        if real != root and root not in real.parents:
+            raise ValueError(f"Запись архива указывает за пределы {cwd}: {path}")
+
+    for path in targets:
+        if path == cwd:
+            continue
+        if path.is_symlink() or path.is_file():
+            change.replace(path)
+        else:
+            change.create_under(path, cwd)
+
+
 class Unzip(Command):
     """
     Распаковка ZIP-архива
@@ -19,6 +54,7 @@ class Unzip(Command):
     )
 
     def run(self, args: list[str], cwd: Path, env: dict) -> None:
+        out = get_output(env)
         if len(args) != 1:
             raise ValueError("Использование: unzip <archive.zip>")
 
@@ -26,7 +62,13 @@ class Unzip(Command):
         if not archive.exists():
             raise FileNotFoundError("Архив не найден")
 
-        with zipfile.ZipFile(archive, "r") as zipf:
-            zipf.extractall(cwd)  # извлекает все файлы из архива
+        change = Change("unzip")
+        try:
+            with zipfile.ZipFile(archive, "r") as zipf:
+                prepare_extract(change, cwd, [zip_destination(cwd, name) for name in zipf.namelist()])
+                zipf.extractall(cwd)  # извлекает все файлы из архива
+        finally:
+            record(change, env)
+            invalidate(env, cwd)
 
-        print(f"Архив {archive.name} успешно распакован в {cwd}")
\ No newline at end of file
+        out.write(f"Архив {archive.name} успешно распакован в {cwd}")
\ No newline at end of file
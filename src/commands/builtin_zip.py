@@ -2,7 +2,9 @@ import zipfile
 
 from pathlib import Path
 from src.commands.base import Command
+from src.output import get_output
 from src.paths import to_path
+from src.walk import split_excludes, walk
 
 
 class Zip(Command):
@@ -11,16 +13,21 @@ class Zip(Command):
     """
 
     name = "zip"
-    help = "zip <folder> <archive.zip>"
+    help = "zip [--exclude GLOB] <folder> <archive.zip>"
     description = (
         "Создаёт ZIP-архив из указанной папки\n\
+        Поддерживает:\n\
+            --exclude GLOB — не добавлять файлы и каталоги по шаблону\n\
         Пример:\n\
-            zip src archive.zip"
+            zip src archive.zip\n\
+            zip --exclude __pycache__ src archive.zip"
     )
 
     def run(self, args: list[str], cwd: Path, env: dict) -> None:
+        out = get_output(env)
+        args, exclude = split_excludes(args)
         if len(args) != 2:
-            raise ValueError("Использование: zip <папка> <архив.zip>")
+            raise ValueError("Использование: zip [--exclude GLOB] <папка> <архив.zip>")
 
         folder = to_path(args[0], cwd)
         archive = to_path(args[1], cwd)
@@ -29,6 +36,8 @@ class Zip(Command):
             raise FileNotFoundError(f"{folder} не существует или не является каталогом")
 
         with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zipf:
-            for file in folder.rglob("*"):
-                zipf.write(file, file.relative_to(folder)) # путь внутри архива относительно папки
-        print(f"Архив {archive} успешно создан")
\ No newline at end of file
+            for rel, entry in walk(folder, exclude):
+                if entry.path == str(archive):
+                    continue  # архив может создаваться внутри архивируемой папки
+                zipf.write(entry.path, rel)  # путь внутри архива относительно папки
+        out.write(f"Архив {archive} успешно создан")
\ No newline at end of file
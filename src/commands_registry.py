@@ -11,6 +11,12 @@ from src.commands.builtin_unzip import Unzip
 from src.commands.builtin_tar import Tar
 from src.commands.builtin_untar import Untar
 from src.commands.builtin_grep import Grep
+from src.commands.builtin_index import IndexCmd
+from src.commands.builtin_cache import CacheCmd
+from src.commands.builtin_du import Du
+from src.commands.builtin_head import Head
+from src.commands.builtin_tail import Tail
+from src.commands.builtin_trash import TrashCmd
 
 
 COMMANDS = {
@@ -26,7 +32,13 @@ COMMANDS = {
     "unzip": Unzip(),
     "tar": Tar(),
     "untar": Untar(),
-    "grep": Grep()
+    "grep": Grep(),
+    "index": IndexCmd(),
+    "cache": CacheCmd(),
+    "du": Du(),
+    "head": Head(),
+    "tail": Tail(),
+    "trash": TrashCmd(),
 }
 
 
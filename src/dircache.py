@@ -0,0 +1,180 @@
+import os
+from collections import OrderedDict
+from pathlib import Path
+
+# сколько каталогов хранится в кэше сеанса
+MAX_DIRS = 256
+
+# каталоги с большим числом записей не кэшируются, чтобы не раздувать память
+MAX_ENTRIES = 100_000
+
+# строка кэша: имя, каталог ли, файл ли, символьная ссылка ли
+Row = tuple[str, bool, bool, bool]
+
+
+class Entry:
+    """
+    Запись каталога из кэша с тем же интерфейсом, что у os.DirEntry
+
+    Тип записи берётся из кэша, а stat запрашивается заново и запоминается
+    только в этом объекте, поэтому размеры и время изменения не устаревают
+    """
+
+    __slots__ = ("_dir", "_file", "_link", "_stat", "name", "path")
+
+    def __init__(self, name: str, path: str, is_dir: bool, is_file: bool, is_link: bool):
+        self.name = name
+        self.path = path
+        self._dir = is_dir
+        self._file = is_file
+        self._link = is_link
+        self._stat: os.stat_result | None = None
+
+    def is_dir(self, follow_symlinks: bool = True) -> bool:
+        return self._dir and (follow_symlinks or not self._link)
+
+    def is_file(self, follow_symlinks: bool = True) -> bool:
+        return self._file and (follow_symlinks or not self._link)
+
+    def is_symlink(self) -> bool:
+        return self._link
+
+    def stat(self, follow_symlinks: bool = True) -> os.stat_result:
+        if not follow_symlinks:
+            return os.lstat(self.path)
+        if self._stat is None:
+            self._stat = os.stat(self.path)
+        return self._stat
+
+    def __repr__(self) -> str:
+        return f"<Entry {self.name!r}>"
+
+
+class DirCache:
+    """
+    LRU-кэш содержимого каталогов на время сеанса оболочки
+
+    Запись проверяется по mtime/ctime каталога: добавление, удаление и переименование
+    внутри каталога меняют их, поэтому устаревший список не вернётся. Команды,
+    которые меняют файлы, дополнительно сбрасывают кэш явно — на файловых системах
+    с грубым временем изменения одной проверки mtime мало
+    """
+
+    def __init__(self, max_dirs: int = MAX_DIRS):
+        self.max_dirs = max_dirs
+        # каталог -> (версия, строки по именам); по имени запись ищется без перебора
+        self._dirs: OrderedDict[str, tuple[tuple[int, int], dict[str, Row]]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def listdir(self, path: Path | str) -> list[Entry]:
+        """Записи каталога; OSError, если каталог нельзя прочитать"""
+        key = str(path)
+        st = os.stat(key)
+        version = (st.st_mtime_ns, st.st_ctime_ns)
+
+        cached = self._dirs.get(key)
+        if cached is not None and cached[0] == version:
+            self.hits += 1
+            self._dirs.move_to_end(key)
+            rows = cached[1].values()
+        else:
+            self.misses += 1
+            rows = self._scan(key)
+            if len(rows) <= MAX_ENTRIES:
+                self._dirs[key] = (version, {row[0]: row for row in rows})
+                self._dirs.move_to_end(key)
+                while len(self._dirs) > self.max_dirs:
+                    self._dirs.popitem(last=False)  # выбрасываем давно не использованный
+
+        return [Entry(name, os.path.join(key, name), d, f, link) for name, d, f, link in rows]
+
+    @staticmethod
+    def _scan(path: str) -> list[Row]:
+        rows = []
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    rows.append((entry.name, entry.is_dir(), entry.is_file(), entry.is_symlink()))
+                except OSError:
+                    rows.append((entry.name, False, False, False))
+        return rows
+
+    def lookup(self, path: Path) -> Entry | None:
+        """
+        Запись о пути из уже закэшированного родительского каталога
+        (None — такого пути нет)
+
+        Каталог ради одного пути не читается: если родителя нет в кэше
+        или он изменился, бросается KeyError, и вызывающий делает обычный stat
+        """
+        key = str(path.parent)
+        cached = self._dirs.get(key)
+        if cached is None or path.parent == path:
+            raise KeyError(key)
+        try:
+            st = os.stat(key)
+        except OSError:
+            raise KeyError(key)
+        if cached[0] != (st.st_mtime_ns, st.st_ctime_ns):
+            raise KeyError(key)
+        self.hits += 1
+        self._dirs.move_to_end(key)
+        row = cached[1].get(path.name)
+        if row is None:
+            return None
+        name, is_dir, is_file, is_link = row
+        return Entry(name, os.path.join(key, name), is_dir, is_file, is_link)
+
+    def invalidate(self, path: Path | str) -> None:
+        """Сбрасывает кэш для пути, его родителя и всех вложенных каталогов"""
+        key = str(path)
+        parent = os.path.dirname(key)
+        prefix = key.rstrip(os.sep) + os.sep
+        for cached in list(self._dirs):
+            if cached in (key, parent) or cached.startswith(prefix):
+                del self._dirs[cached]
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        self.invalidations += len(self._dirs)
+        self._dirs.clear()
+
+    def stats(self) -> dict:
+        return {
+            "dirs": len(self._dirs),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+def get_cache(env: dict) -> DirCache | None:
+    """Кэш сеанса из env (при прямом вызове команды его может не быть)"""
+    return env.get("dircache")
+
+
+def invalidate(env: dict, *paths: Path) -> None:
+    """Вызывается командами, которые меняют файлы"""
+    cache = get_cache(env)
+    if cache is not None:
+        for p in paths:
+            cache.invalidate(p)
+
+
+def path_kind(env: dict, path: Path) -> str | None:
+    """'dir', 'file' или None, если пути нет; если родитель уже в кэше — по его записи"""
+    cache = get_cache(env)
+    if cache is not None:
+        try:
+            entry = cache.lookup(path)
+        except KeyError:
+            pass  # родитель не прочитан: одного stat достаточно
+        else:
+            if entry is None or (entry.is_symlink() and not entry.is_dir() and not entry.is_file()):
+                return None  # нет такого пути или битая символьная ссылка
+            return "dir" if entry.is_dir() else "file"
+    if path.is_dir():
+        return "dir"
+    return "file" if path.exists() else None
@@ -0,0 +1,136 @@
+import errno
+import os
+import shutil
+from collections.abc import Iterator
+from pathlib import Path
+from typing import NamedTuple
+
+# сколько байт копируется за один системный вызов
+CHUNK_SIZE = 8 * 1024 * 1024
+
+# ошибки, при которых copy_file_range/sendfile не работают для этой пары файлов
+KERNEL_COPY_UNSUPPORTED = {errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP, errno.EXDEV, errno.EBADF}
+
+
+class CopyResult(NamedTuple):
+    """Итог копирования дерева"""
+
+    files: int
+    bytes: int
+    dirs: int
+    seconds: float
+
+
+def copy_range(src_fd: int, dst_fd: int, offset: int, length: int) -> int:
+    """
+    Копирует length байт с позиции offset в то же место dst_fd
+
+    Сначала пробует os.copy_file_range (копирование внутри ядра, а на части файловых
+    систем — клонирование блоков или копирование на стороне сервера), затем
+    os.sendfile, и только если оба не поддерживаются — чтение и запись через память.
+    Возвращает число скопированных байт (меньше length, если файл укоротился)
+    """
+    copied = 0
+    end = offset + length
+
+    if hasattr(os, "copy_file_range"):
+        try:
+            while offset + copied < end:
+                pos = offset + copied
+                n = os.copy_file_range(src_fd, dst_fd, min(CHUNK_SIZE, end - pos), pos, pos)
+                if n == 0:
+                    return copied
+                copied += n
+            return copied
+        except OSError as e:
+            if e.errno not in KERNEL_COPY_UNSUPPORTED or copied:
+                raise
+
+    if hasattr(os, "sendfile"):
+        try:
+            os.lseek(dst_fd, offset, os.SEEK_SET)
+            while offset + copied < end:
+                pos = offset + copied
+                n = os.sendfile(dst_fd, src_fd, pos, min(CHUNK_SIZE, end - pos))
+                if n == 0:
+                    return copied
+                copied += n
+            return copied
+        except OSError as e:
+            if e.errno not in KERNEL_COPY_UNSUPPORTED or copied:
+                raise
+
+    while offset + copied < end:
+        pos = offset + copied
+        data = os.pread(src_fd, min(CHUNK_SIZE, end - pos), pos)
+        if not data:
+            break
+        os.pwrite(dst_fd, data, pos)
+        copied += len(data)
+    return copied
+
+
+def is_sparse(st: os.stat_result) -> bool:
+    """Занимает ли файл на диске меньше своего размера (значит, в нём есть дыры)"""
+    blocks = getattr(st, "st_blocks", None)
+    return blocks is not None and blocks * 512 < st.st_size
+
+
+def data_ranges(fd: int, size: int) -> Iterator[tuple[int, int]]:
+    """
+    Участки файла с данными как (смещение, длина), дыры пропускаются
+
+    Использует lseek с SEEK_DATA/SEEK_HOLE; если система или файловая система
+    их не поддерживает, весь файл считается одним участком
+    """
+    if not hasattr(os, "SEEK_DATA"):
+        if size:
+            yield 0, size
+        return
+    pos = 0
+    while pos < size:
+        try:
+            start = os.lseek(fd, pos, os.SEEK_DATA)
+        except OSError as e:
+            if e.errno == errno.ENXIO:
+                return  # дальше до конца файла только дыра
+            if pos == 0 and e.errno in KERNEL_COPY_UNSUPPORTED:
+                yield 0, size
+                return
+            raise
+        end = min(os.lseek(fd, start, os.SEEK_HOLE), size)
+        if end > start:
+            yield start, end - start
+        pos = end
+
+
+def is_same_file(a: Path | str, b: Path | str) -> bool:
+    """Один ли это файл (та же запись на диске, в том числе через ссылки)"""
+    try:
+        return os.path.samefile(a, b)
+    except OSError:
+        return False  # одного из путей нет
+
+
+def copy_file(src: Path | str, dst: Path | str) -> int:
+    """
+    Копирует файл с метаданными, как shutil.copy2, но данными внутри ядра
+
+    У разреженных файлов копируются только участки с данными, а дыры остаются
+    дырами: образ диска на 10 ГиБ с 100 МиБ данных не превратится в 10 ГиБ нулей.
+    Возвращает число скопированных байт. Если src и dst — один файл, бросает
+    shutil.SameFileError до открытия dst на запись (иначе файл обнулится)
+    """
+    if is_same_file(src, dst):
+        raise shutil.SameFileError(f"{src} и {dst} — один и тот же файл")
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        st = os.fstat(fsrc.fileno())
+        if is_sparse(st):
+            copied = 0
+            for offset, length in data_ranges(fsrc.fileno(), st.st_size):
+                copied += copy_range(fsrc.fileno(), fdst.fileno(), offset, length)
+            fdst.truncate(st.st_size)  # дыра в конце файла
+        else:
+            copied = copy_range(fsrc.fileno(), fdst.fileno(), 0, st.st_size)
+    shutil.copystat(src, dst)
+    return copied
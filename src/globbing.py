@@ -0,0 +1,125 @@
+import os
+import re
+from collections.abc import Iterator
+from fnmatch import translate
+from itertools import islice
+from pathlib import Path
+
+from src.dircache import DirCache, get_cache
+from src.paths import HOME
+
+# символы шаблона; в кавычках они экранируются и означают сами себя
+GLOB_CHARS = set("*?[")
+
+# больше путей по одному шаблону не подставляется: команда получает список целиком
+MAX_MATCHES = 100_000
+
+
+def has_magic(part: str) -> bool:
+    return any(ch in GLOB_CHARS for ch in part)
+
+
+class Expander:
+    """
+    Подстановка путей по шаблонам *, ?, [...] и ** для одной строки команды
+
+    Каждый каталог читается одним os.scandir (через кэш сеанса, если он есть)
+    и запоминается до конца строки, поэтому `cp a/*.txt a/*.md b/` читает a/
+    один раз. Пути выдаются генератором, и обход прекращается, как только
+    набралось больше MAX_MATCHES совпадений
+    """
+
+    def __init__(self, cwd: Path, env: dict, max_matches: int = MAX_MATCHES):
+        self.cwd = cwd
+        self.max_matches = max_matches
+        self._cache = get_cache(env) or DirCache()
+        self._listings: dict[str, list] = {}
+
+    def listdir(self, path: str) -> list:
+        """Записи каталога по имени; нечитаемый каталог считается пустым"""
+        entries = self._listings.get(path)
+        if entries is None:
+            try:
+                entries = sorted(self._cache.listdir(path), key=lambda e: e.name)
+            except OSError:
+                entries = []
+            self._listings[path] = entries
+        return entries
+
+    def expand(self, text: str, pattern: str) -> list[str]:
+        """
+        Пути по шаблону в порядке имён
+
+        text — аргумент как его ввели, pattern — он же с экранированными
+        символами из кавычек. Если совпадений нет, аргумент остаётся как есть
+        """
+        found = list(islice(dict.fromkeys(self.matches(pattern)), self.max_matches + 1))
+        if len(found) > self.max_matches:
+            raise ValueError(f"Шаблон {text} подходит больше чем к {self.max_matches} путям, уточните его")
+        return found or [text]
+
+    def matches(self, pattern: str) -> Iterator[str]:
+        if pattern.startswith("/"):
+            base, shown = "/", "/"
+        elif pattern == "~" or pattern.startswith("~/"):
+            base, shown, pattern = str(HOME), "~/", pattern[2:]
+        else:
+            base, shown = str(self.cwd), ""
+        dir_only = pattern.endswith("/")
+        parts = [p for p in pattern.split("/") if p]
+        if parts:
+            yield from self._walk(base, shown, parts, dir_only)
+
+    def _walk(self, base: str, shown: str, parts: list[str], dir_only: bool) -> Iterator[str]:
+        part, rest = parts[0], parts[1:]
+        suffix = "/" if dir_only else ""
+
+        if part == "**":
+            # ** — любое число каталогов, в том числе ни одного; ссылки на каталоги не раскрываются
+            if rest:
+                yield from self._walk(base, shown, rest, dir_only)
+            for entry in self.listdir(base):
+                if entry.name.startswith("."):
+                    continue
+                is_dir = entry.is_dir(follow_symlinks=False)
+                if not rest and (is_dir or not dir_only):
+                    yield shown + entry.name + suffix
+                if is_dir:
+                    yield from self._walk(entry.path, shown + entry.name + "/", parts, dir_only)
+            return
+
+        if not has_magic(part):
+            path = os.path.join(base, part)
+            if rest:
+                if os.path.isdir(path):
+                    yield from self._walk(path, shown + part + "/", rest, dir_only)
+            elif os.path.isdir(path) if dir_only else os.path.lexists(path):
+                yield shown + part + suffix
+            return
+
+        regex = re.compile(translate(part))
+        hidden = part.startswith(".")
+        for entry in self.listdir(base):
+            if entry.name.startswith(".") and not hidden:
+                continue  # скрытые файлы — только по шаблону, который начинается с точки
+            if not regex.match(entry.name):
+                continue
+            if rest:
+                if entry.is_dir():
+                    yield from self._walk(entry.path, shown + entry.name + "/", rest, dir_only)
+            elif not dir_only or entry.is_dir():
+                yield shown + entry.name + suffix
+
+
+def expand_args(words: list[tuple[str, str | None]], cwd: Path, env: dict) -> list[str]:
+    """Аргументы после подстановки; слова без шаблона (pattern is None) не меняются"""
+    expander = None
+    args = []
+    for text, pattern in words:
+        if pattern is None:
+            args.append(text)
+            continue
+        if expander is None:
+            expander = Expander(cwd, env)
+        args.extend(expander.expand(text, pattern))
+    return args
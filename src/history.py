@@ -0,0 +1,199 @@
+import os
+import struct
+from collections.abc import Iterator
+from pathlib import Path
+
+from src.util import BLOCK_SIZE, tail_offset
+
+# файл истории переименовывается в .history.1, когда становится больше этого размера
+MAX_HISTORY_SIZE = 8 * 1024 * 1024
+
+# сколько старых файлов истории (.history.1 ... .history.N) хранится
+HISTORY_KEEP = 3
+
+# индекс: 8 байт — сколько строк ушло в старые файлы, затем по 8 байт на смещение каждой строки
+OFFSET = struct.Struct("<Q")
+
+
+class HistoryStore:
+    """
+    История команд: файл только для дописывания и индекс смещений строк рядом
+
+    По индексу последние N строк читаются одним seek без просмотра файла, номер
+    команды — это число строк в индексе. Большой файл уходит в .history.1,
+    самые старые файлы удаляются
+    """
+
+    def __init__(self, path: Path, max_size: int = MAX_HISTORY_SIZE, keep: int = HISTORY_KEEP):
+        self.path = path
+        self.index_path = path.with_name(path.name + ".idx")
+        self.max_size = max_size
+        self.keep = keep
+        self._checked = False
+
+    def rotated(self, k: int) -> Path:
+        return self.path.with_name(f"{self.path.name}.{k}")
+
+    # --- индекс ---
+
+    def _read_base(self) -> int:
+        try:
+            with open(self.index_path, "rb") as f:
+                head = f.read(OFFSET.size)
+        except FileNotFoundError:
+            return 0
+        return OFFSET.unpack(head)[0] if len(head) == OFFSET.size else 0
+
+    def _rebuild(self, base: int) -> None:
+        """Строит индекс заново одним проходом по файлу (старая история, сбой записи)"""
+        offsets = []
+        pos = 0
+        line_start = True
+        try:
+            with open(self.path, "rb") as f:
+                while block := f.read(BLOCK_SIZE):
+                    i = 0
+                    while i < len(block):
+                        if line_start:
+                            offsets.append(pos + i)
+                            line_start = False
+                        nl = block.find(b"\n", i)
+                        if nl < 0:
+                            break
+                        line_start = True
+                        i = nl + 1
+                    pos += len(block)
+        except FileNotFoundError:
+            pass
+        tmp = self.index_path.with_name(self.index_path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(OFFSET.pack(base))
+            f.write(b"".join(OFFSET.pack(o) for o in offsets))
+        os.replace(tmp, self.index_path)
+
+    def _check(self) -> None:
+        """Один раз за сеанс сверяет хвост индекса с файлом и при расхождении перестраивает"""
+        if self._checked:
+            return
+        self._checked = True
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        size = self.path.stat().st_size if self.path.exists() else 0
+        if size:
+            with open(self.path, "rb+") as f:
+                f.seek(size - 1)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")  # оборванная строка не должна склеиться со следующей
+                    size += 1
+
+        try:
+            idx_size = self.index_path.stat().st_size
+        except FileNotFoundError:
+            idx_size = 0
+        count = (idx_size - OFFSET.size) // OFFSET.size
+        ok = idx_size >= OFFSET.size and (idx_size - OFFSET.size) % OFFSET.size == 0
+        if ok and count == 0:
+            ok = size == 0
+        elif ok:
+            last = self._offset(count - 1)
+            if last >= size:
+                ok = False
+            else:
+                with open(self.path, "rb") as f:
+                    f.seek(last)
+                    ok = f.read(BLOCK_SIZE).count(b"\n") == 1  # после последней строки ничего
+        if not ok:
+            self._rebuild(self._read_base())
+
+    def _offset(self, i: int) -> int:
+        with open(self.index_path, "rb") as f:
+            f.seek(OFFSET.size * (i + 1))
+            return OFFSET.unpack(f.read(OFFSET.size))[0]
+
+    def count(self) -> int:
+        """Сколько строк в текущем файле истории"""
+        self._check()
+        return (self.index_path.stat().st_size - OFFSET.size) // OFFSET.size
+
+    # --- запись ---
+
+    def append(self, line: str) -> None:
+        self._check()
+        data = (line.replace("\n", " ") + "\n").encode("utf-8")
+        with open(self.path, "ab") as f:
+            offset = f.tell()
+            f.write(data)
+        with open(self.index_path, "ab") as f:
+            f.write(OFFSET.pack(offset))
+        if offset + len(data) > self.max_size:
+            self.rotate()
+
+    def rotate(self) -> None:
+        """Текущий файл становится .1, старые сдвигаются, лишние удаляются"""
+        base = self._read_base() + self.count()
+        for k in range(self.keep, 0, -1):
+            src = self.path if k == 1 else self.rotated(k - 1)
+            if src.exists():
+                os.replace(src, self.rotated(k))
+        with open(self.index_path, "wb") as f:
+            f.write(OFFSET.pack(base))
+
+    # --- чтение ---
+
+    def tail(self, n: int) -> list[tuple[int, str]]:
+        """Последние n команд с номерами; работа пропорциональна n, а не размеру истории"""
+        count = self.count()
+        base = self._read_base()
+        k = min(n, count)
+        result = []
+        if k:
+            with open(self.path, "rb") as f:
+                f.seek(self._offset(count - k))
+                lines = f.read().decode("utf-8", errors="replace").splitlines()
+            result = [(base + count - k + 1 + i, line) for i, line in enumerate(lines)]
+
+        need = n - k
+        last = base  # номер последней строки в следующем по старшинству файле
+        for i in range(1, self.keep + 1):  # недостающее — из концов старых файлов
+            older = self.rotated(i)
+            if need <= 0 or not older.exists():
+                break
+            with open(older, "rb") as f:
+                f.seek(tail_offset(f, need))
+                lines = f.read().decode("utf-8", errors="replace").splitlines()
+            first = last - len(lines) + 1
+            result = [(first + j, line) for j, line in enumerate(lines)] + result
+            need -= len(lines)
+            last = first - 1
+        return result
+
+    def search(self, pattern: str) -> Iterator[tuple[int, str]]:
+        """Команды, содержащие pattern, от старых к новым; файлы читаются построчно"""
+        files = [self.rotated(k) for k in range(self.keep, 0, -1) if self.rotated(k).exists()]
+        # номера строк в старых файлах: сколько строк в них всего, считается по кускам
+        older_lines = 0
+        for p in files:
+            with open(p, "rb") as f:
+                while block := f.read(BLOCK_SIZE):
+                    older_lines += block.count(b"\n")
+        self._check()
+        number = self._read_base() - older_lines
+
+        for p in files + [self.path]:
+            if not p.exists():
+                continue  # сразу после ротации текущего файла ещё нет
+            with open(p, "r", encoding="utf-8", errors="replace") as f:
+                for line in f:
+                    number += 1
+                    if pattern in line:
+                        yield number, line.rstrip("\n")
+
+
+_stores: dict[Path, HistoryStore] = {}
+
+
+def get_store(path: Path) -> HistoryStore:
+    """Одно хранилище на файл за время работы процесса"""
+    store = _stores.get(path)
+    if store is None:
+        store = _stores[path] = HistoryStore(path)
+    return store
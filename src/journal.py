@@ -0,0 +1,144 @@
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+
+from src import trash
+from src.util import tail_offset
+
+# журнал изменяющих операций для undo: по строке JSON на операцию
+JOURNAL_FILE = Path("src/data/.journal")
+
+
+class Change:
+    """
+    Изменения файлов, сделанные одной командой
+
+    created — пути, которых до команды не было (вложенные в уже записанный
+    каталог не повторяются); moved — пары (откуда, куда); trashed — пары
+    (путь, id в корзине) для удалённого и перезаписанного
+    """
+
+    def __init__(self, op: str):
+        self.op = op
+        self.created: list[str] = []
+        self.moved: list[tuple[str, str]] = []
+        self.trashed: list[tuple[str, str]] = []
+        self._created_set: set[str] = set()
+
+    def create(self, path: Path) -> None:
+        key = str(path)
+        if key in self._created_set or any(str(p) in self._created_set for p in path.parents):
+            return
+        self._created_set.add(key)
+        self.created.append(key)
+
+    def create_under(self, path: Path, root: Path) -> None:
+        """Записывает самый верхний ещё не существующий каталог на пути от root к path"""
+        if path.exists() or path.is_symlink():
+            return
+        top = path
+        for parent in path.parents:
+            if parent == root or parent.exists():
+                break
+            top = parent
+        self.create(top)
+
+    def move(self, src: Path, dst: Path) -> None:
+        self.moved.append((str(src), str(dst)))
+
+    def backup(self, path: Path) -> trash.TrashItem:
+        """Переносит path в корзину (переименованием), чтобы undo мог его вернуть"""
+        item = trash.move_to_trash(path)
+        self.trashed.append((str(path), item.id))
+        return item
+
+    def replace(self, path: Path) -> None:
+        """Путь будет перезаписан: старое — в корзину, новое — в созданные"""
+        self.backup(path)
+        self.create(path)
+
+    def __bool__(self) -> bool:
+        return bool(self.created or self.moved or self.trashed)
+
+
+def record(change: Change, env: dict) -> None:
+    """Дописывает операцию в конец журнала (пустые изменения не записываются)"""
+    if not change:
+        return
+    entry = {
+        "op": change.op,
+        "line": env.get("line", change.op),
+        "time": time.time(),
+        "created": change.created,
+        "moved": change.moved,
+        "trashed": change.trashed,
+    }
+    txn = env.get("txn")
+    if txn is not None:
+        entry["txn"] = txn["id"]
+        txn["ops"] += 1
+    JOURNAL_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(JOURNAL_FILE, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+def last() -> tuple[int, dict] | None:
+    """
+    Последняя операция журнала и смещение начала её строки
+
+    Читается только хвост файла, поэтому время не зависит от длины журнала.
+    Недописанная строка (оболочку прервали во время записи) отбрасывается
+    """
+    while True:
+        try:
+            with open(JOURNAL_FILE, "rb") as f:
+                offset = tail_offset(f, 1)
+                f.seek(offset)
+                line = f.read()
+        except FileNotFoundError:
+            return None
+        if not line.strip():
+            return None
+        try:
+            return offset, json.loads(line)
+        except ValueError:
+            drop(offset)
+
+
+def drop(offset: int) -> None:
+    """Отрезает от журнала всё, начиная с offset (снятие последней операции)"""
+    os.truncate(JOURNAL_FILE, offset)
+
+
+def trash_ids() -> set[str]:
+    """id объектов корзины, которые нужны журналу для undo (в том числе в открытой транзакции)"""
+    ids: set[str] = set()
+    try:
+        with open(JOURNAL_FILE, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    ids.update(item_id for _, item_id in json.loads(line).get("trashed", []))
+                except (ValueError, TypeError, AttributeError):
+                    continue  # недописанная строка
+    except FileNotFoundError:
+        pass
+    return ids
+
+
+def begin(env: dict) -> str:
+    """Открывает транзакцию: следующие операции помечаются её id"""
+    if env.get("txn") is not None:
+        raise ValueError("Транзакция уже начата: завершите её через commit или rollback")
+    txn_id = uuid.uuid4().hex[:12]
+    env["txn"] = {"id": txn_id, "ops": 0}
+    return txn_id
+
+
+def end(env: dict) -> dict:
+    """Закрывает транзакцию и возвращает её состояние"""
+    txn = env.pop("txn", None)
+    if txn is None:
+        raise ValueError("Транзакция не начата (begin)")
+    return txn
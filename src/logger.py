@@ -1,16 +1,65 @@
+import atexit
+import json
 import logging
+import logging.handlers
+import os
+import queue
+
 from pathlib import Path
 
 
-LOG_FILE = Path.cwd() / "shell.log"
+# лог лежит рядом с данными оболочки, а не в каталоге, откуда её запустили;
+# другое место можно задать переменной окружения MINISHELL_LOG
+LOG_FILE = Path(os.environ.get("MINISHELL_LOG", Path(__file__).resolve().parent / "data" / "shell.log"))
+
+# ротация: "size" — по размеру файла, "daily" — каждую полночь (MINISHELL_LOG_ROTATE)
+LOG_ROTATE = os.environ.get("MINISHELL_LOG_ROTATE", "size")
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 5
+
+# поля структурированной записи о команде (передаются через extra)
+FIELDS = ("command", "argv", "duration_ms", "result", "bytes", "error")
+
+
+class StructuredFormatter(logging.Formatter):
+    """[время] строка команды | command="ls" argv=["-l"] duration_ms=1.3 result="ok" bytes=120"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        extra = [
+            f"{name}={json.dumps(getattr(record, name), ensure_ascii=False)}"
+            for name in FIELDS
+            if hasattr(record, name)
+        ]
+        return f"{line} | {' '.join(extra)}" if extra else line
+
+
+def make_file_handler() -> logging.Handler:
+    LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+    if LOG_ROTATE == "daily":
+        handler = logging.handlers.TimedRotatingFileHandler(
+            LOG_FILE, when="midnight", backupCount=LOG_BACKUPS, encoding="utf-8"
+        )
+    else:
+        handler = logging.handlers.RotatingFileHandler(
+            LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8"
+        )
+    handler.setFormatter(StructuredFormatter("[%(asctime)s] %(message)s", datefmt="%Y-%m-%d %H:%M:%S"))
+    return handler
 
 
 def get_logger():
+    """
+    Логгер оболочки: команда только кладёт запись в очередь, а в файл её пишет
+    фоновый поток QueueListener, поэтому запись лога не задерживает команды
+    """
     logger = logging.getLogger("mini_shell")
     logger.setLevel(logging.INFO)
     if not logger.handlers:
-        fh = logging.FileHandler(LOG_FILE, encoding="utf-8")
-        fmt = logging.Formatter("[%(asctime)s] %(message)s", datefmt="%Y-%m-%d %H:%M:%S")
-        fh.setFormatter(fmt)
-        logger.addHandler(fh)
-    return logger
\ No newline at end of file
+        records: queue.SimpleQueue = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(records, make_file_handler())
+        listener.start()
+        atexit.register(listener.stop)  # дописать очередь до выхода из процесса
+        logger.addHandler(logging.handlers.QueueHandler(records))
+        logger.propagate = False
+    return logger
@@ -1,10 +1,19 @@
+import sys
+import time
 import typer
 
 from pathlib import Path
 from src.commands_registry import get_command, all_commands
 from src.logger import get_logger
 from src.commands.builtin_history import HISTORY_FILE
+from src.history import get_store
 from src.colors import CYAN, RESET, GREEN, RED
+from src.output import Output
+from src.dircache import DirCache
+from src.commands.builtin_undo import rollback_txn
+from src.pipeline import run_pipeline, split_pipeline
+from src.globbing import GLOB_CHARS, expand_args
+from src import journal
 
 
 app = typer.Typer(help="Мини-оболочка с файловыми командами")
@@ -69,10 +78,18 @@ def exec_once(cmd: str) -> None:
     run_once(cmd)
 
 
-def parse(line: str):
-    """Разбивает строку на аргументы, учитывая кавычки и пробелы"""
-    args = []
+def parse_words(line: str) -> list[tuple[str, str | None]]:
+    """
+    Разбивает строку на слова, учитывая кавычки и пробелы
+
+    Для каждого слова возвращает (текст, шаблон): шаблон есть, только если
+    в слове вне кавычек встретились *, ? или [; символы шаблона из кавычек
+    в нём экранированы и подставляются как есть
+    """
+    words = []
     current = ""
+    pattern = ""
+    magic = False
     quote = None
 
     for ch in line:
@@ -81,27 +98,44 @@ def parse(line: str):
                 quote = None  # конец кавычек
             else:
                 current += ch
+                pattern += f"[{ch}]" if ch in GLOB_CHARS else ch
         else:
             if ch in ("'", '"'):
                 quote = ch
             elif ch.isspace():
                 if current:
-                    args.append(current)
-                    current = ""
+                    words.append((current, pattern if magic else None))
+                current = pattern = ""
+                magic = False
             else:
                 current += ch
+                pattern += ch
+                magic = magic or ch in GLOB_CHARS
 
     if quote is not None:
         raise ValueError("Не все кавычки закрыты")
-    
+
     if current:
-        args.append(current)
+        words.append((current, pattern if magic else None))
+    return words
 
+
+def parse(line: str):
+    """Разбивает строку на имя команды и аргументы без подстановки шаблонов"""
+    args = [text for text, _ in parse_words(line)]
     if not args:
         return "", []
     return args[0], args[1:]
 
 
+def parse_command(line: str, cwd: Path, env: dict) -> tuple[str, list[str]]:
+    """Имя команды и аргументы с подставленными путями по шаблонам"""
+    words = parse_words(line)
+    if not words:
+        return "", []
+    return words[0][0], expand_args(words[1:], cwd, env)
+
+
 def print_help_overview() -> None:
     """Печатает список всех команд с их кратким описанием"""
     names = all_commands()
@@ -114,6 +148,9 @@ def print_help_overview() -> None:
         cmd = get_command(name)
         synopsis = getattr(cmd, "help", "").strip()  # возвращает атрибут конкретной команды, еслои его нет, то ничего
         print(f"  {name.ljust(maxw)}  {synopsis}")
+    print("Транзакции: begin — начать, commit — зафиксировать, rollback — отменить все операции")
+    print("Конвейеры: cat app.log | grep ERROR | head -n 50 — строки передаются между командами по одной")
+    print("Шаблоны путей: *, ?, [...], ** (rm *.tmp, grep ERROR logs/**/*.log); в кавычках не раскрываются")
 
 
 def print_help_for(name: str) -> None:
@@ -130,6 +167,52 @@ def print_help_for(name: str) -> None:
         print(desc)
 
 
+def run_transaction(name: str, env: dict, out: Output) -> None:
+    """
+    begin / commit / rollback
+
+    Операции внутри транзакции пишутся в общий журнал undo с её id, а всё
+    перезаписываемое и удаляемое переименовывается в корзину, поэтому commit
+    только закрывает транзакцию, а rollback отменяет её записи с конца журнала —
+    в обоих случаях работа зависит от числа операций, а не от объёма данных
+    """
+    if name == "begin":
+        txn_id = journal.begin(env)
+        out.write(f"Транзакция {txn_id} начата")
+    elif name == "commit":
+        txn = journal.end(env)
+        out.write(f"Транзакция {txn['id']} зафиксирована, операций: {txn['ops']}")
+    else:
+        txn = env.get("txn")
+        if txn is None:
+            raise ValueError("Транзакция не начата (begin)")
+        undone = rollback_txn(txn["id"], env, out)
+        journal.end(env)  # незавершённый откат бросит исключение и оставит транзакцию открытой
+        out.write(f"Транзакция {txn['id']} отменена, операций: {undone}")
+
+
+TRANSACTION_COMMANDS = ("begin", "commit", "rollback")
+
+
+def parse_pipeline(segments: list[str], cwd: Path, env: dict) -> list[tuple]:
+    """Команды конвейера с аргументами; все имена проверяются до запуска"""
+    stages = []
+    for segment in segments:
+        name, args = parse_command(segment, cwd, env)
+        if not name:
+            raise ValueError("Пустая команда в конвейере")
+        command = get_command(name)
+        if not command:
+            raise ValueError(f"Неизвестная команда: {name}")
+        stages.append((command, args))
+    return stages
+
+
+def new_env(cwd: Path) -> dict:
+    """Состояние оболочки, общее для всех команд одного сеанса"""
+    return {"cwd": cwd, "undo": [], "out": Output(), "dircache": DirCache()}
+
+
 def run_once(cmd: str, cwd: Path | None = None, env: dict | None = None) -> tuple[Path, dict]:
     """
     Выполняет одну команду
@@ -137,33 +220,157 @@ def run_once(cmd: str, cwd: Path | None = None, env: dict | None = None) -> tupl
 
     logger = get_logger()
     cwd = cwd or Path.cwd()
-    env = env or {"cwd": cwd, "undo": []}
+    env = env or new_env(cwd)
+    out = env.setdefault("out", Output())
 
-    logger.info(cmd)
+    env["line"] = cmd  # исходная строка попадает в журнал undo
 
     if not cmd.strip().startswith("undo"):
-        HISTORY_FILE.parent.mkdir(parents=True, exist_ok=True)
-        with open(HISTORY_FILE, "a", encoding="utf-8") as f:
-            f.write(cmd + "\n")
-
-    name, args = parse(cmd)
-    command = get_command(name)
-    if not command:
-        print(f"Неизвестная команда: {name}")
-        logger.info("ERROR: Unknown command")
-        return cwd, env
+        get_store(HISTORY_FILE).append(cmd)
 
+    name, args = "", []
+    result, error = "ok", None
+    written = out.written
+    start = time.perf_counter()
     try:
-        new_cwd = command.run(args, cwd, env)
-        if new_cwd is not None:
-            cwd = new_cwd
+        segments = split_pipeline(cmd)
+        if len(segments) > 1:
+            stages = parse_pipeline(segments, cwd, env)
+            name = " | ".join(command.name for command, _ in stages)
+            args = [stage_args for _, stage_args in stages]
+            run_pipeline(stages, cwd, env, out)
+        else:
+            name, args = parse_command(cmd, cwd, env)
+            if name in TRANSACTION_COMMANDS and not args:
+                run_transaction(name, env, out)
+            else:
+                command = get_command(name)
+                if not command:
+                    result, error = "unknown", "Unknown command"
+                    out.write(f"Неизвестная команда: {name}")
+                else:
+                    new_cwd = command.run(args, cwd, env)
+                    if new_cwd is not None:
+                        cwd = new_cwd
     except Exception as exc:
-        print(f"{RED}Ошибка:{RESET} {exc}")
-        logger.info(f"ERROR: {exc}")
+        result, error = "error", str(exc)
+        out.write(f"{RED}Ошибка:{RESET} {exc}")
+        if env.get("txn") is not None:
+            out.write("Транзакция открыта: rollback отменит все её операции")
+    finally:
+        out.flush()
+        fields = {
+            "command": name,
+            "argv": args,
+            "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+            "result": result,
+            "bytes": out.written - written,
+        }
+        if error is not None:
+            fields["error"] = error
+        env["last_run"] = fields  # итог команды для run-script
+        logger.info(cmd, extra=fields)  # только постановка в очередь, файл пишет фоновый поток
 
     return cwd, env
 
 
+class ScriptStats:
+    """Время и итоги команд сценария по именам команд"""
+
+    def __init__(self):
+        self.by_name: dict[str, list] = {}    # имя -> [запусков, всего мс, макс мс, ошибок]
+        self.commands = 0
+        self.failed = 0
+        self.total_ms = 0.0
+
+    def add(self, fields: dict) -> None:
+        row = self.by_name.setdefault(fields["command"] or "?", [0, 0.0, 0.0, 0])
+        ms = fields["duration_ms"]
+        row[0] += 1
+        row[1] += ms
+        row[2] = max(row[2], ms)
+        self.commands += 1
+        self.total_ms += ms
+        if fields["result"] != "ok":
+            row[3] += 1
+            self.failed += 1
+
+    def write(self, out: Output) -> None:
+        out.write(f"Команд: {self.commands}, ошибок: {self.failed}, время: {self.total_ms:.1f} мс")
+        if not self.by_name:
+            return
+        width = max(len(name) for name in self.by_name)
+        out.write(f"  {'команда'.ljust(width)}  {'раз':>5}  {'всего мс':>10}  {'макс мс':>10}  {'ошибок':>6}")
+        for name, (runs, total, worst, errors) in sorted(self.by_name.items(), key=lambda kv: -kv[1][1]):
+            out.write(f"  {name.ljust(width)}  {runs:>5}  {total:>10.1f}  {worst:>10.1f}  {errors:>6}")
+
+
+def run_lines(lines, cwd: Path, env: dict, stop_on_error: bool = False) -> tuple[Path, ScriptStats, bool]:
+    """
+    Выполняет строки сценария по очереди через run_once с общими cwd и env
+
+    Пустые строки и комментарии (#) пропускаются, `set -e` / `set +e` включают
+    и выключают остановку на первой ошибке, `exit` завершает сценарий.
+    Строки читаются по одной, поэтому сценарий может приходить из канала.
+    Возвращает (cwd, статистику, остановлен ли сценарий на ошибке)
+    """
+    stats = ScriptStats()
+    out = env["out"]
+    for number, raw in enumerate(lines, start=1):
+        line = raw.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line in ("set -e", "set +e"):
+            stop_on_error = line == "set -e"
+            continue
+        if line in ("exit", "quit"):
+            break
+        cwd, env = run_once(line, cwd=cwd, env=env)
+        fields = env["last_run"]
+        stats.add(fields)
+        if stop_on_error and fields["result"] != "ok":
+            out.write(f"{RED}Сценарий остановлен{RESET} на строке {number}: {line}")
+            return cwd, stats, True
+    return cwd, stats, False
+
+
+@app.command(name="run-script", help="Выполнить команды из файла (- — из stdin) в одном процессе")
+def run_script(
+    path: str = typer.Argument(..., help="Файл сценария или - для stdin"),
+    stop_on_error: bool = typer.Option(False, "-e", help="Остановиться на первой ошибке (как set -e)"),
+    summary: bool = typer.Option(True, "--summary/--no-summary", help="Вывести время выполнения команд"),
+) -> None:
+    """
+    Выполняет команды сценария по строке в одном процессе
+
+    Текущий каталог, транзакции и кэши сохраняются между командами, как в
+    интерактивной оболочке, а интерпретатор и команды загружаются один раз.
+    Код выхода 1, если хотя бы одна команда завершилась ошибкой
+
+    Пример:
+        python -m src.main run-script deploy.msh
+        printf 'cd src\\nls\\n' | python -m src.main run-script -e -
+    """
+    cwd = Path.cwd()
+    env = new_env(cwd)
+    env["interactive"] = False  # вопросы команд (rm каталога) читали бы строки сценария
+    if path == "-":
+        cwd, stats, _ = run_lines(sys.stdin, cwd, env, stop_on_error)
+    else:
+        script = Path(path)
+        if not script.is_file():
+            print(f"{RED}Ошибка:{RESET} сценарий не найден: {path}")
+            raise typer.Exit(1)
+        with open(script, "r", encoding="utf-8") as f:
+            cwd, stats, _ = run_lines(f, cwd, env, stop_on_error)
+
+    if summary:
+        stats.write(env["out"])
+        env["out"].flush()
+    if stats.failed:
+        raise typer.Exit(1)
+
+
 @app.command(help="Запустить интерактивную оболочку")
 def run_repl():
     """
@@ -175,7 +382,7 @@ def run_repl():
 
     logger = get_logger()
     cwd = Path.cwd()
-    env = {"cwd": cwd, "undo": []}
+    env = new_env(cwd)
     print("MiniShell (help: 'help', exit: 'exit')")
 
     while True:
@@ -0,0 +1,124 @@
+import codecs
+import io
+import sys
+from typing import TextIO
+
+# сколько символов копится в буфере перед записью в поток
+BUFFER_SIZE = 64 * 1024
+
+
+class Output:
+    """
+    Буферизованный вывод команд
+
+    Строки копятся в памяти и пишутся в поток крупными кусками.
+    Если поток — терминал, каждая строка выводится сразу, чтобы пользователь
+    видел результат по мере работы команды
+    """
+
+    def __init__(self, stream: TextIO | None = None, buffer_size: int = BUFFER_SIZE):
+        self._stream = stream           # None — текущий sys.stdout на момент записи
+        self.buffer_size = buffer_size
+        self._parts: list[str] = []
+        self._size = 0
+        self.written = 0                # сколько выведено всего (символов и байт) — для лога
+        self._tty_stream: TextIO | None = None  # поток, для которого запомнен результат isatty
+        self._tty = False
+
+    @property
+    def stream(self) -> TextIO:
+        return self._stream if self._stream is not None else sys.stdout
+
+    @property
+    def interactive(self) -> bool:
+        """Терминал ли поток; isatty — системный вызов, поэтому проверяется один раз на поток"""
+        stream = self.stream
+        if stream is not self._tty_stream:
+            self._tty_stream = stream
+            try:
+                self._tty = stream.isatty()
+            except (AttributeError, ValueError):
+                self._tty = False
+        return self._tty
+
+    def write(self, line: str = "") -> None:
+        """Добавляет строку вывода (перевод строки дописывается сам)"""
+        self._parts.append(line)
+        self._parts.append("\n")
+        self._size += len(line) + 1
+        self.written += len(line) + 1
+        if self._size >= self.buffer_size or self.interactive:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._parts:
+            self.stream.write("".join(self._parts))
+            self._parts.clear()
+            self._size = 0
+        self.stream.flush()
+
+    def write_bytes(self, data: bytes) -> None:
+        """
+        Пишет байты как есть (для cat): в байтовый буфер потока, если он есть,
+        иначе декодирует с заменой некорректных последовательностей
+        """
+        self.flush()
+        self.written += len(data)
+        raw = getattr(self.stream, "buffer", None)
+        if raw is not None:
+            raw.write(data)
+            raw.flush()
+        else:
+            self.stream.write(data.decode("utf-8", errors="replace"))
+
+    def fileno(self) -> int | None:
+        """Дескриптор потока вывода, если он настоящий файл/канал/терминал"""
+        try:
+            return self.stream.fileno()
+        except (AttributeError, ValueError, io.UnsupportedOperation):
+            return None
+
+
+class PrintOutput(Output):
+    """Вывод без буфера через print — для вызова команд без общего вывода в env"""
+
+    def write(self, line: str = "") -> None:
+        self.written += len(line) + 1
+        print(line)
+
+
+class CaptureOutput(Output):
+    """Вывод в память: удобно проверять результат команд в тестах"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: list[str] = []
+        # байты приходят кусками, многобайтовый символ может оказаться на границе
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    def write(self, line: str = "") -> None:
+        self.written += len(line) + 1
+        self._chunks.append(line + "\n")
+
+    def write_bytes(self, data: bytes) -> None:
+        self.written += len(data)
+        self._chunks.append(self._decoder.decode(data))
+
+    def flush(self) -> None:
+        pass
+
+    def fileno(self) -> int | None:
+        return None
+
+    def getvalue(self) -> str:
+        return "".join(self._chunks)
+
+    @property
+    def lines(self) -> list[str]:
+        return self.getvalue().splitlines()
+
+
+def get_output(env: dict) -> Output:
+    """Общий вывод оболочки из env; без него строки печатаются сразу"""
+    out = env.get("out")
+    return out if out is not None else PrintOutput()
@@ -0,0 +1,61 @@
+from collections.abc import Iterator
+from pathlib import Path
+
+from src.commands.base import Command
+from src.output import Output
+
+
+def split_pipeline(line: str) -> list[str]:
+    """Делит строку на команды конвейера по | вне кавычек"""
+    parts = []
+    current = ""
+    quote = None
+    for ch in line:
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in ("'", '"'):
+            quote = ch
+        elif ch == "|":
+            parts.append(current)
+            current = ""
+            continue
+        current += ch
+    parts.append(current)
+    return parts
+
+
+def file_lines(path: Path, encoding: str = "utf-8") -> Iterator[str]:
+    """Строки файла без перевода строки; файл читается по мере запроса строк"""
+    with open(path, "r", encoding=encoding, errors="replace", newline="") as f:
+        for line in f:
+            yield line.rstrip("\r\n")
+
+
+def close_stream(stream) -> None:
+    """Останавливает генератор выше по конвейеру: он закрывает свои файлы и дальше не читает"""
+    close = getattr(stream, "close", None)
+    if close is not None:
+        close()
+
+
+def run_pipeline(stages: list[tuple[Command, list[str]]], cwd: Path, env: dict, out: Output) -> None:
+    """
+    Выполняет конвейер cmd1 | cmd2 | ... в одном процессе
+
+    Каждая команда получает строки предыдущей как генератор и сама отдаёт
+    генератор, поэтому строки проходят по конвейеру по одной и целиком нигде
+    не собираются. Когда последняя команда получила всё нужное (head -n 50),
+    генераторы закрываются и чтение выше по конвейеру прекращается
+    """
+    streams = []
+    stream = None
+    try:
+        for command, args in stages:
+            stream = command.stream(args, cwd, env, stream)
+            streams.append(stream)
+        for line in stream:
+            out.write(line)
+    finally:
+        for s in reversed(streams):
+            close_stream(s)
@@ -0,0 +1,212 @@
+import hashlib
+import os
+import pickle
+from pathlib import Path
+
+from src.walk import DEFAULT_EXCLUDES, walk_files
+
+INDEX_DIR = Path("src/data/.index")
+
+# файлы больше этого размера не индексируются и всегда проверяются целиком
+MAX_INDEXED_SIZE = 64 * 1024 * 1024
+
+# сколько байт с начала файла проверяется на признаки бинарного файла (как в grep)
+BINARY_PROBE = 8192
+
+
+def index_file(root: Path) -> Path:
+    """Файл индекса для каталога: имя — хэш абсолютного пути"""
+    digest = hashlib.sha1(str(root).encode("utf-8", "surrogateescape")).hexdigest()[:16]
+    return INDEX_DIR / f"{digest}.pickle"
+
+
+def trigrams(data: bytes) -> set[bytes]:
+    """Множество триграмм буфера (ASCII приводится к нижнему регистру)"""
+    data = data.lower()
+    return {data[i:i + 3] for i in range(len(data) - 2)}
+
+
+class TrigramIndex:
+    """
+    Триграммный индекс каталога
+
+    Обходит дерево так же, как grep по умолчанию (.gitignore и DEFAULT_EXCLUDES)
+
+    files: относительный путь через '/' -> (размер, mtime_ns, id файла)
+    postings: триграмма -> множество id файлов, где она встречается
+    unindexed: id файлов, которые не удалось проиндексировать (слишком большие)
+    binary: id бинарных файлов — grep их всё равно пропускает
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.files: dict[str, tuple[int, int, int]] = {}
+        self.postings: dict[bytes, set[int]] = {}
+        self.unindexed: set[int] = set()
+        self.binary: set[int] = set()
+        self.next_id = 0
+
+    @classmethod
+    def load(cls, root: Path) -> "TrigramIndex | None":
+        path = index_file(root)
+        if not path.exists():
+            return None
+        with open(path, "rb") as f:
+            index = pickle.load(f)
+        return index if isinstance(index, cls) and index.root == root else None
+
+    @classmethod
+    def find(cls, path: Path) -> "TrigramIndex | None":
+        """Ищет индекс, построенный для path или одного из его родителей"""
+        for root in (path, *path.parents):
+            if index_file(root).exists():
+                return cls.load(root)
+        return None
+
+    def save(self) -> None:
+        INDEX_DIR.mkdir(parents=True, exist_ok=True)
+        path = index_file(self.root)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)  # атомарная замена, чтобы не оставить полузаписанный индекс
+
+    def update(self) -> tuple[int, int, int]:
+        """
+        Приводит индекс в соответствие с каталогом
+
+        Перечитываются только новые файлы и файлы с изменившимися размером или mtime.
+        Возвращает (добавлено/обновлено, удалено, без изменений)
+        """
+        seen = set()
+        changed = []
+        unchanged = 0
+        for rel, entry in walk_files(self.root, exclude=DEFAULT_EXCLUDES, ignore_files=True):
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            seen.add(rel)
+            old = self.files.get(rel)
+            if old and old[0] == st.st_size and old[1] == st.st_mtime_ns:
+                unchanged += 1
+            else:
+                changed.append((rel, Path(entry.path), st))
+
+        removed = [rel for rel in self.files if rel not in seen]
+        stale = {self.files[rel][2] for rel in removed}
+        stale |= {self.files[rel][2] for rel, _, _ in changed if rel in self.files}
+        self._forget(stale)
+        for rel in removed:
+            del self.files[rel]
+
+        for rel, p, st in changed:
+            self._add(rel, p, st)
+
+        return len(changed), len(removed), unchanged
+
+    def _forget(self, ids: set[int]) -> None:
+        """Убирает файлы из списков вхождений одним проходом по индексу"""
+        if not ids:
+            return
+        for gram in list(self.postings):
+            posting = self.postings[gram]
+            posting -= ids
+            if not posting:
+                del self.postings[gram]
+        self.unindexed -= ids
+        self.binary -= ids
+
+    def _add(self, rel: str, p: Path, st: os.stat_result) -> None:
+        file_id = self.next_id
+        self.next_id += 1
+        self.files[rel] = (st.st_size, st.st_mtime_ns, file_id)
+
+        if st.st_size > MAX_INDEXED_SIZE:
+            self.unindexed.add(file_id)
+            return
+        try:
+            data = p.read_bytes()
+        except OSError:
+            self.unindexed.add(file_id)
+            return
+        if b"\0" in data[:BINARY_PROBE]:
+            self.binary.add(file_id)
+            return
+        for gram in trigrams(data):
+            self.postings.setdefault(gram, set()).add(file_id)
+
+    def candidates(self, literals: list[bytes]) -> set[int] | None:
+        """
+        id файлов, в которых могут встретиться все обязательные подстроки
+
+        None — индекс не помогает сузить поиск (нет подстрок длиной от 3 байт)
+        """
+        grams = set()
+        for lit in literals:
+            grams |= trigrams(lit)
+        if not grams:
+            return None
+
+        result = None
+        for gram in sorted(grams, key=lambda g: len(self.postings.get(g, ()))):
+            posting = self.postings.get(gram, set())
+            result = set(posting) if result is None else result & posting
+            if not result:
+                break
+        return (result or set()) | self.unindexed
+
+    def is_fresh(self, rel: str, st: os.stat_result) -> int | None:
+        """id файла (путь относительно корня индекса), если индекс для него актуален"""
+        entry = self.files.get(rel)
+        if entry and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+            return entry[2]
+        return None
+
+
+def required_literals(pattern: str, literal: bool) -> list[str]:
+    """
+    Подстроки, которые обязательно входят в любое совпадение шаблона
+
+    Разбор консервативный: при альтернативе '|' и группах ничего не возвращается,
+    символ перед ?, * и {m,n} считается необязательным
+    """
+    if literal:
+        return [pattern]
+    if "|" in pattern or "(" in pattern:
+        return []
+
+    runs = []
+    cur = ""
+    i = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == "\\":
+            runs.append(cur)
+            cur = ""
+            i += 2
+            continue
+        if ch == "[":
+            runs.append(cur)
+            cur = ""
+            i += 1
+            while i < len(pattern) and pattern[i] != "]":
+                i += 2 if pattern[i] == "\\" else 1
+            i += 1
+            continue
+        if ch in "?*{":
+            runs.append(cur[:-1])
+            cur = ""
+            if ch == "{":
+                end = pattern.find("}", i)
+                i = end if end != -1 else len(pattern)
+            i += 1
+            continue
+        if ch in ".^$+)":
+            runs.append(cur)
+            cur = ""
+        else:
+            cur += ch
+        i += 1
+    runs.append(cur)
+    return [r for r in runs if len(r) >= 3]
@@ -0,0 +1,374 @@
+import errno
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import NamedTuple
+
+from src.walk import walk_files
+
+# корзина для файловой системы, на которой лежат данные оболочки
+TRASH_DIR = Path("src/data/.trash")
+
+# корзина на остальных файловых системах: каталог в корне точки монтирования
+MOUNT_TRASH_NAME = ".shell-trash"
+
+# индекс всех корзин: по строке JSON на запись, последняя строка с тем же id главнее
+TRASH_INDEX = Path("src/data/.trash_index")
+
+# индекс переписывается целиком, когда устаревших строк становится больше, чем живых
+COMPACT_MIN_LINES = 100
+
+# потоки, удаляющие файлы при очистке корзины
+DELETE_WORKERS = 4
+
+# сколько файлов в секунду удаляет фоновая очистка, чтобы не мешать остальным командам
+BACKGROUND_DELETE_RATE = 2000
+
+# как часто фоновая очистка проверяет корзину (секунды)
+PURGE_INTERVAL = 600
+
+# индекс меняют и команды, и фоновая очистка
+_index_lock = threading.RLock()
+
+
+class TrashItem(NamedTuple):
+    """Удалённый объект в корзине"""
+
+    id: str
+    path: str                   # где объект лежал до удаления
+    location: str               # где он лежит в корзине
+    deleted: float              # время удаления (time.time())
+    size: int | None            # размер в байтах; у каталогов считается при первом запросе
+    is_dir: bool
+
+
+def load_index() -> dict[str, TrashItem]:
+    """Записи индекса в порядке удаления; битые строки пропускаются"""
+    items: dict[str, TrashItem] = {}
+    try:
+        with open(TRASH_INDEX, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    if record.get("removed"):
+                        items.pop(record["id"], None)
+                    else:
+                        items[record["id"]] = TrashItem(**record)
+                except (ValueError, TypeError, KeyError):
+                    continue
+    except FileNotFoundError:
+        pass
+    return items
+
+
+def _append(records: list[dict]) -> None:
+    TRASH_INDEX.parent.mkdir(parents=True, exist_ok=True)
+    with _index_lock, open(TRASH_INDEX, "a", encoding="utf-8") as f:
+        f.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records))
+
+
+def _compact_if_needed() -> None:
+    """Переписывает индекс без удалённых и перезаписанных строк, если их стало много"""
+    with _index_lock:
+        try:
+            with open(TRASH_INDEX, "rb") as f:
+                total = sum(1 for _ in f)
+        except FileNotFoundError:
+            return
+        items = load_index()
+        if total < COMPACT_MIN_LINES or total <= 2 * len(items):
+            return
+        tmp = TRASH_INDEX.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(item._asdict(), ensure_ascii=False) + "\n" for item in items.values())
+        os.replace(tmp, TRASH_INDEX)
+
+
+def update(item: TrashItem) -> None:
+    _append([item._asdict()])
+
+
+def forget(ids: list[str]) -> None:
+    """Убирает записи из индекса (после восстановления или окончательного удаления)"""
+    if ids:
+        _append([{"id": i, "removed": True} for i in ids])
+        _compact_if_needed()
+
+
+_mount_trash: dict[int, Path] = {}
+
+
+def trash_dir_for(path: Path) -> Path:
+    """
+    Корзина на той же файловой системе, что и path, чтобы удаление было
+    переименованием, а не копированием
+    """
+    home = TRASH_DIR.resolve()
+    home.mkdir(parents=True, exist_ok=True)
+    dev = os.stat(path.parent).st_dev
+    if dev == os.stat(home).st_dev:
+        return home
+
+    cached = _mount_trash.get(dev)
+    if cached is not None:
+        return cached
+    mount = path.parent
+    while mount.parent != mount and os.stat(mount.parent).st_dev == dev:
+        mount = mount.parent
+    _mount_trash[dev] = mount / MOUNT_TRASH_NAME
+    return _mount_trash[dev]
+
+
+def move_to_trash(target: Path) -> TrashItem:
+    """
+    Переносит target в корзину его файловой системы под уникальным id
+
+    Переименование не зависит от размера объекта. Если корзину на этой файловой
+    системе создать нельзя (нет прав на корень точки монтирования), объект
+    копируется в основную корзину
+    """
+    item_id = f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    is_dir = target.is_dir() and not target.is_symlink()
+    size = None if is_dir else target.lstat().st_size
+    try:
+        trash = trash_dir_for(target)
+        trash.mkdir(exist_ok=True)
+        location = trash / item_id
+        os.rename(target, location)
+    except OSError as e:
+        if e.errno not in (errno.EXDEV, errno.EACCES, errno.EPERM, errno.EROFS):
+            raise
+        location = TRASH_DIR.resolve() / item_id
+        shutil.move(str(target), str(location))
+
+    item = TrashItem(item_id, str(target), str(location), time.time(), size, is_dir)
+    update(item)
+    return item
+
+
+def item_size(item: TrashItem) -> int:
+    """Размер объекта в корзине; размер каталога считается один раз и запоминается"""
+    if item.size is not None:
+        return item.size
+    size = 0
+    for _, entry in walk_files(Path(item.location)):
+        try:
+            size += entry.stat(follow_symlinks=False).st_size
+        except OSError:
+            continue
+    update(item._replace(size=size))
+    return size
+
+
+def find(key: str, items: dict[str, TrashItem] | None = None) -> TrashItem | None:
+    """Запись по id или по исходному пути (самая свежая из удалённых по этому пути)"""
+    items = load_index() if items is None else items
+    if key in items:
+        return items[key]
+    for item in reversed(list(items.values())):
+        if item.path == key:
+            return item
+    return None
+
+
+def restore(item: TrashItem, dest: Path | None = None) -> Path:
+    """Возвращает объект на исходное место (или в dest) и убирает его из индекса"""
+    dest = Path(item.path) if dest is None else dest
+    if dest.exists() or dest.is_symlink():
+        raise FileExistsError(f"Путь уже занят: {dest}")
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.rename(item.location, dest)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.move(item.location, str(dest))
+    forget([item.id])
+    return dest
+
+
+SIZE_UNITS = {"": 1, "B": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+
+
+def parse_size(value: str) -> int:
+    """'500M' -> байты; без единицы — байты"""
+    number, unit = value[:-1], value[-1:].upper()
+    if unit.isdigit():
+        number, unit = value, ""
+    if unit not in SIZE_UNITS or not number.replace(".", "", 1).isdigit():
+        raise ValueError(f"Непонятный размер: {value} (пример: 500M, 10G)")
+    return int(float(number) * SIZE_UNITS[unit])
+
+
+def parse_duration(value: str) -> float:
+    """'7d' -> секунды; без единицы — дни"""
+    number, unit = value[:-1], value[-1:].lower()
+    if unit.isdigit():
+        number, unit = value, "d"
+    if unit not in DURATION_UNITS or not number.replace(".", "", 1).isdigit():
+        raise ValueError(f"Непонятный срок: {value} (пример: 30m, 12h, 7d)")
+    return float(number) * DURATION_UNITS[unit]
+
+
+class RateLimiter:
+    """Не больше per_second операций в секунду на все потоки вместе"""
+
+    def __init__(self, per_second: float):
+        self.interval = 1.0 / per_second
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next, now)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def delete_tree(path: Path, workers: int = DELETE_WORKERS, limiter: RateLimiter | None = None) -> int:
+    """
+    Окончательно удаляет файл или дерево, возвращает число удалённых записей
+
+    Каталоги читаются и очищаются параллельно: каждый поток берёт каталог,
+    удаляет в нём файлы и отдаёт найденные подкаталоги остальным. Пустые каталоги
+    удаляются в конце, начиная с самых глубоких. limiter ограничивает скорость удаления
+    """
+    if path.is_symlink() or not path.is_dir():
+        if limiter is not None:
+            limiter.wait()
+        path.unlink()
+        return 1
+
+    def clear_dir(d: str) -> tuple[list[str], int]:
+        subdirs = []
+        removed = 0
+        with os.scandir(d) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                    continue
+                if limiter is not None:
+                    limiter.wait()
+                os.unlink(entry.path)
+                removed += 1
+        return subdirs, removed
+
+    dirs = [str(path)]
+    removed = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {pool.submit(clear_dir, dirs[0])}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                subdirs, n = future.result()
+                removed += n
+                dirs.extend(subdirs)
+                pending |= {pool.submit(clear_dir, d) for d in subdirs}
+
+    for d in sorted(dirs, key=lambda p: p.count(os.sep), reverse=True):
+        os.rmdir(d)
+    return removed + len(dirs)
+
+
+class PurgeResult(NamedTuple):
+    """Итог очистки корзины"""
+
+    count: int                  # удалено объектов
+    freed: int                  # освобождено байт
+    kept: int                   # не тронуто: их ещё может вернуть undo
+
+
+def purge(
+    older_than: float | None = None,
+    max_size: int | None = None,
+    workers: int = DELETE_WORKERS,
+    limiter: RateLimiter | None = None,
+    keep: set[str] | frozenset[str] = frozenset(),
+) -> PurgeResult:
+    """
+    Окончательно удаляет объекты из корзины, начиная с самых старых
+
+    older_than — удалить всё, что лежит дольше стольких секунд;
+    max_size — затем удалять старые объекты, пока корзина не уложится в размер.
+    Без условий корзина очищается целиком. Объекты с id из keep (на них
+    ссылается журнал undo) не удаляются, но занимаемое ими место учитывается
+    """
+    items = sorted(load_index().values(), key=lambda item: item.deleted)
+    protected = [item for item in items if item.id in keep]
+    items = [item for item in items if item.id not in keep]
+    if older_than is None and max_size is None:
+        selected = items
+    else:
+        selected = []
+        rest = items
+        if older_than is not None:
+            cutoff = time.time() - older_than
+            selected = [item for item in items if item.deleted < cutoff]
+            rest = [item for item in items if item.deleted >= cutoff]
+        if max_size is not None:
+            total = sum(item_size(item) for item in rest + protected)
+            for item in rest:
+                if total <= max_size:
+                    break
+                selected.append(item)
+                total -= item_size(item)
+
+    removed = []
+    freed = 0
+    try:
+        for item in selected:
+            size = item_size(item)
+            try:
+                delete_tree(Path(item.location), workers, limiter)
+            except FileNotFoundError:
+                pass  # объект уже удалили вручную
+            removed.append(item.id)
+            freed += size
+    finally:
+        forget(removed)  # одна запись в индекс и одно сжатие, даже если очистку прервали
+    return PurgeResult(len(removed), freed, len(protected))
+
+
+class Purger(threading.Thread):
+    """
+    Фоновая очистка корзины по квоте: раз в interval секунд вызывает purge
+    с ограничением скорости удаления, не трогая объекты из keep()
+    """
+
+    def __init__(
+        self,
+        older_than: float | None,
+        max_size: int | None,
+        interval: float = PURGE_INTERVAL,
+        rate: float = BACKGROUND_DELETE_RATE,
+        keep: Callable[[], set[str]] | None = None,
+    ):
+        super().__init__(name="trash-purger", daemon=True)
+        self.older_than = older_than
+        self.max_size = max_size
+        self.interval = interval
+        self.limiter = RateLimiter(rate)
+        self.keep = keep                # перед каждым проходом: id, которые ещё нужны undo
+        self.stopped = threading.Event()
+        self.last_error: Exception | None = None
+
+    def run(self) -> None:
+        while not self.stopped.is_set():
+            try:
+                keep = self.keep() if self.keep is not None else frozenset()
+                purge(self.older_than, self.max_size, limiter=self.limiter, keep=keep)
+            except (OSError, ValueError) as e:  # фоновый поток не должен падать молча и навсегда
+                self.last_error = e
+            self.stopped.wait(self.interval)
+
+    def stop(self) -> None:
+        self.stopped.set()
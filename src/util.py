@@ -0,0 +1,59 @@
+import os
+from typing import BinaryIO
+
+# размер блока при чтении файла
+BLOCK_SIZE = 64 * 1024
+
+
+def positive_int(value: str, flag: str) -> int:
+    """Разбирает числовое значение флага вроде -j N или -m N"""
+    if not value.isdigit() or int(value) < 1:
+        raise ValueError(f"После {flag} нужно указать положительное число")
+    return int(value)
+
+
+def human_size(n: int) -> str:
+    """1536 -> 1.5K"""
+    if n < 1024:
+        return str(n)
+    size = float(n)
+    for unit in ("K", "M", "G", "T"):
+        size /= 1024
+        if size < 1024 or unit == "T":
+            break
+    return f"{size:.1f}{unit}"
+
+
+def tail_offset(f: BinaryIO, n: int) -> int:
+    """
+    Смещение, с которого начинаются последние n строк файла
+
+    Файл читается блоками с конца, поэтому работа пропорциональна размеру
+    этих n строк, а не всего файла
+    """
+    end = f.seek(0, os.SEEK_END)
+    if n == 0 or end == 0:
+        return end
+
+    pos = end
+    newlines = 0
+    # перевод строки в самом конце файла не начинает новую строку
+    f.seek(end - 1)
+    skip_last = f.read(1) == b"\n"
+
+    while pos > 0:
+        size = min(BLOCK_SIZE, pos)
+        pos -= size
+        f.seek(pos)
+        block = f.read(size)
+        if skip_last and pos + size == end:
+            block = block[:-1]
+        i = len(block)
+        while True:
+            i = block.rfind(b"\n", 0, i)
+            if i < 0:
+                break
+            newlines += 1
+            if newlines == n:
+                return pos + i + 1
+    return 0
@@ -0,0 +1,191 @@
+import fnmatch
+import os
+import re
+from collections.abc import Iterator
+from contextlib import nullcontext
+from pathlib import Path
+from typing import NamedTuple
+
+# каталоги, которые grep и index пропускают, если не указан --no-ignore
+DEFAULT_EXCLUDES = (".git", "node_modules", "__pycache__")
+
+# файл с правилами игнорирования в стиле .gitignore
+IGNORE_FILE = ".gitignore"
+
+
+class IgnoreRule(NamedTuple):
+    """Одно правило из файла игнорирования"""
+
+    base: str               # каталог с файлом правил относительно корня обхода ("" — корень)
+    regex: re.Pattern
+    negate: bool            # правило вида !pattern
+    dir_only: bool          # правило вида pattern/
+
+
+def translate(pattern: str) -> str:
+    """
+    Переводит шаблон .gitignore в регулярное выражение для относительного пути
+
+    * и ? не переходят через '/', ** совпадает с любым числом каталогов
+    """
+    out = []
+    i = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+            continue
+        if ch == "*":
+            out.append("[^/]*")
+        elif ch == "?":
+            out.append("[^/]")
+        elif ch == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                out.append(re.escape(ch))
+            else:
+                body = pattern[i + 1:end].replace("\\", "\\\\")
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append(f"[{body}]")
+                i = end
+        else:
+            out.append(re.escape(ch))
+        i += 1
+    return "".join(out)
+
+
+def parse_ignore_file(path: str, base: str) -> list[IgnoreRule]:
+    """Читает правила из файла игнорирования; отсутствующий файл — пустой список"""
+    try:
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return []
+
+    rules = []
+    for line in lines:
+        line = line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+        # шаблон без '/' внутри совпадает с именем на любом уровне вложенности
+        if "/" in line:
+            source = translate(line.lstrip("/"))
+        else:
+            source = "(?:.*/)?" + translate(line)
+        rules.append(IgnoreRule(base, re.compile(source), negate, dir_only))
+    return rules
+
+
+def is_ignored(rules: list[IgnoreRule], rel: str, is_dir: bool) -> bool:
+    """Последнее подходящее правило решает, игнорируется ли путь"""
+    ignored = False
+    for rule in rules:
+        if rule.dir_only and not is_dir:
+            continue
+        if rule.base:
+            if not rel.startswith(rule.base + "/"):
+                continue
+            sub = rel[len(rule.base) + 1:]
+        else:
+            sub = rel
+        if rule.regex.fullmatch(sub):
+            ignored = not rule.negate
+    return ignored
+
+
+def is_excluded(name: str, rel: str, exclude: tuple[str, ...] | list[str]) -> bool:
+    """Совпадает ли имя или относительный путь с одним из шаблонов --exclude"""
+    return any(fnmatch.fnmatch(name, pat) or fnmatch.fnmatch(rel, pat) for pat in exclude)
+
+
+def walk(
+    root: Path,
+    exclude: tuple[str, ...] | list[str] = (),
+    ignore_files: bool = False,
+    recursive: bool = True,
+    cache=None,
+) -> Iterator[tuple[str, os.DirEntry]]:
+    """
+    Лениво обходит дерево каталогов через os.scandir
+
+    Выдаёт пары (относительный путь через '/', DirEntry). Каталог выдаётся раньше
+    своего содержимого; исключённые каталоги отсекаются до спуска в них.
+    DirEntry хранит тип и результат stat, поэтому повторные проверки бесплатны.
+    Символьные ссылки на каталоги выдаются, но не обходятся.
+    С кэшем сеанса (src.dircache.DirCache) списки каталогов берутся из него
+    """
+    stack: list[tuple[str, str, list[IgnoreRule]]] = [("", str(root), [])]
+    while stack:
+        rel_dir, abs_dir, rules = stack.pop()
+        if ignore_files:
+            rules = rules + parse_ignore_file(os.path.join(abs_dir, IGNORE_FILE), rel_dir)
+
+        try:
+            it = os.scandir(abs_dir) if cache is None else nullcontext(cache.listdir(abs_dir))
+        except OSError:
+            continue  # нет прав или каталог исчез во время обхода
+
+        subdirs = []
+        with it as entries:
+            for entry in entries:
+                rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    is_dir = False
+                if exclude and is_excluded(entry.name, rel, exclude):
+                    continue
+                if rules and is_ignored(rules, rel, is_dir):
+                    continue
+                yield rel, entry
+                if is_dir and recursive:
+                    subdirs.append((rel, entry.path, rules))
+
+        stack.extend(reversed(subdirs))  # сохраняем порядок каталогов при обходе в глубину
+
+
+def walk_files(
+    root: Path,
+    exclude: tuple[str, ...] | list[str] = (),
+    ignore_files: bool = False,
+    recursive: bool = True,
+    cache=None,
+) -> Iterator[tuple[str, os.DirEntry]]:
+    """То же, что walk, но только обычные файлы"""
+    for rel, entry in walk(root, exclude, ignore_files, recursive, cache):
+        try:
+            if entry.is_file():
+                yield rel, entry
+        except OSError:
+            continue
+
+
+def split_excludes(args: list[str]) -> tuple[list[str], list[str]]:
+    """Выделяет из аргументов шаблоны --exclude GLOB и --exclude=GLOB"""
+    rest = []
+    exclude = []
+    it = iter(args)
+    for a in it:
+        if a == "--exclude":
+            value = next(it, None)
+            if value is None:
+                raise ValueError("После --exclude нужно указать шаблон")
+            exclude.append(value)
+        elif a.startswith("--exclude="):
+            exclude.append(a.partition("=")[2])
+        else:
+            rest.append(a)
+    return rest, exclude
@@ -0,0 +1,12 @@
+import pytest
+
+from src import journal, trash
+
+
+@pytest.fixture(autouse=True)
+def isolated_data(tmp_path_factory, monkeypatch):
+    """Корзина и журнал undo в тестах не должны попадать в src/data"""
+    data = tmp_path_factory.mktemp("data")
+    monkeypatch.setattr(trash, "TRASH_DIR", data / ".trash")
+    monkeypatch.setattr(trash, "TRASH_INDEX", data / ".trash_index")
+    monkeypatch.setattr(journal, "JOURNAL_FILE", data / ".journal")
@@ -1,10 +1,17 @@
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import MagicMock, Mock, patch
 from pathlib import Path
 from datetime import datetime
 from src.commands.builtin_ls import Ls, format_long
 
 
+def fake_scandir(target):
+    """Подмена os.scandir: записи каталога берутся из мока target.iterdir()"""
+    it = MagicMock()
+    it.__enter__.return_value = iter(target.iterdir())
+    return it
+
+
 class TestLs:
     
     def setup_method(self):
@@ -12,6 +19,12 @@ class TestLs:
         self.ls = Ls()
         self.cwd = Path("/test/cwd")
         self.env = {}
+        # ls читает каталог через os.scandir, содержимое задаётся моками iterdir
+        self.scandir = patch('os.scandir', side_effect=fake_scandir)
+        self.scandir.start()
+
+    def teardown_method(self):
+        self.scandir.stop()
     
     def test_ls_current_directory(self):
         """Тест: ls без аргументов должен показать содержимое текущей директории"""
@@ -255,6 +268,104 @@ class TestLs:
             assert calls == expected
 
 
+    def test_ls_sort_by_size_and_time(self):
+        """Тест: -S сортирует по размеру, -t по времени, stat у записи вызывается один раз"""
+        mock_target = Mock(spec=Path)
+        mock_target.exists.return_value = True
+        mock_target.is_file.return_value = False
+
+        files = []
+        for name, size, dt in [("a.txt", 10, datetime(2023, 1, 3)),
+                               ("b.txt", 30, datetime(2023, 1, 1)),
+                               ("c.txt", 20, datetime(2023, 1, 2))]:
+            mock_file = Mock(spec=Path)
+            mock_file.name = name
+            mock_stat = Mock()
+            mock_stat.st_mode = 0o100644
+            mock_stat.st_size = size
+            mock_stat.st_mtime = dt.timestamp()
+            mock_file.stat.return_value = mock_stat
+            files.append(mock_file)
+        mock_target.iterdir.return_value = files
+
+        with patch('src.commands.builtin_ls.to_path', return_value=mock_target), \
+             patch('builtins.print') as mock_print:
+            self.ls.run(["-S"], self.cwd, self.env)
+            assert [c[0][0] for c in mock_print.call_args_list] == ["b.txt", "c.txt", "a.txt"]
+            assert all(f.stat.call_count == 1 for f in files)
+
+            mock_print.reset_mock()
+            self.ls.run(["-t"], self.cwd, self.env)
+            assert [c[0][0] for c in mock_print.call_args_list] == ["a.txt", "c.txt", "b.txt"]
+
+    def test_ls_unsorted_streams_in_directory_order(self):
+        """Тест: -U выводит записи в порядке чтения каталога"""
+        mock_target = Mock(spec=Path)
+        mock_target.exists.return_value = True
+        mock_target.is_file.return_value = False
+        files = []
+        for name in ["z", "a", "m"]:
+            mock_file = Mock(spec=Path)
+            mock_file.name = name
+            files.append(mock_file)
+        mock_target.iterdir.return_value = files
+
+        with patch('src.commands.builtin_ls.to_path', return_value=mock_target), \
+             patch('builtins.print') as mock_print:
+            self.ls.run(["-U"], self.cwd, self.env)
+            assert [c[0][0] for c in mock_print.call_args_list] == ["z", "a", "m"]
+
+    def test_ls_real_directory_single_stat(self, tmp_path):
+        """Тест: на настоящем каталоге -lS даёт тот же формат, что и format_long"""
+        (tmp_path / "small.txt").write_text("x")
+        (tmp_path / "big.txt").write_text("x" * 100)
+        self.scandir.stop()
+        with patch('builtins.print') as mock_print:
+            self.ls.run(["-lS", str(tmp_path)], self.cwd, self.env)
+        self.scandir.start()
+        calls = [c[0][0] for c in mock_print.call_args_list]
+        assert calls == [format_long(tmp_path / "big.txt"), format_long(tmp_path / "small.txt")]
+
+
+class TestLsRecursive:
+    """ls -R и -j на настоящих каталогах"""
+
+    def make_tree(self, root):
+        for rel, size in [("b.txt", 5), ("A.txt", 50), ("sub/x.txt", 1), ("sub/deep/y.txt", 2),
+                          ("zdir/z.txt", 3)]:
+            p = root / rel
+            p.parent.mkdir(parents=True, exist_ok=True)
+            p.write_text("x" * size)
+
+    def run_ls(self, args):
+        with patch('builtins.print') as mock_print:
+            Ls().run(args, Path("/"), {})
+        return [c[0][0] if c[0] else "" for c in mock_print.call_args_list]
+
+    def test_ls_recursive(self, tmp_path):
+        """Тест: -R выводит каждый каталог с заголовком, обход в глубину"""
+        self.make_tree(tmp_path)
+        lines = self.run_ls(["-R", str(tmp_path)])
+        assert lines == [
+            f"{tmp_path}:", "A.txt", "b.txt", "sub", "zdir",
+            "", f"{tmp_path / 'sub'}:", "deep", "x.txt",
+            "", f"{tmp_path / 'sub' / 'deep'}:", "y.txt",
+            "", f"{tmp_path / 'zdir'}:", "z.txt",
+        ]
+
+    def test_ls_threaded_stat_keeps_order(self, tmp_path):
+        """Тест: -j N даёт тот же вывод, что и последовательный режим"""
+        self.make_tree(tmp_path)
+        for args in (["-lR"], ["-lS"], ["-lU"]):
+            sequential = self.run_ls(args + [str(tmp_path)])
+            threaded = self.run_ls(args + ["-j", "4", str(tmp_path)])
+            assert threaded == sequential
+
+    def test_ls_invalid_workers(self, tmp_path):
+        with pytest.raises(ValueError):
+            Ls().run(["-j", "0", str(tmp_path)], Path("/"), {})
+
+
 class TestFormatLong:
     """Отдельные тесты для функции format_long - важно тестировать утилиты отдельно"""
     
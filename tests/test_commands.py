@@ -1,16 +1,44 @@
+import errno
+import io
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tarfile
+import threading
+import time
+import zipfile
 import pytest
 from pathlib import Path
 
+import src.logger
+import src.main
 from src.commands.builtin_cd import Cd
 from src.commands.builtin_cat import Cat
 from src.commands.builtin_cp import Cp
 from src.commands.builtin_mv import Mv
-from src.commands.builtin_rm import Rm, TRASH_DIR
-from src.commands.builtin_grep import Grep
+from src.commands.builtin_rm import Rm
+from src.commands.builtin_trash import TrashCmd
+from src.commands.builtin_undo import Undo
+from src.history import HistoryStore
+from src import trash
+from src.commands.builtin_grep import Grep, Query
+from src.commands.builtin_index import IndexCmd
 from src.commands.builtin_zip import Zip
 from src.commands.builtin_unzip import Unzip
 from src.commands.builtin_tar import Tar
 from src.commands.builtin_untar import Untar
+from src.walk import walk, walk_files
+from src.output import CaptureOutput, Output
+from src.dircache import DirCache, path_kind
+from src.fastcopy import copy_file, is_sparse
+from src.commands.builtin_ls import Ls
+from src.commands.builtin_du import Du, DuScan
+from src.commands.builtin_head import Head
+from src.commands.builtin_tail import Tail, follow
+from src.pipeline import split_pipeline
+from src.globbing import Expander
 
 
 class TestCd:
@@ -63,6 +91,29 @@ class TestCat:
             self.cat.run(["dir"], cwd=tmp_path, env={})
 
 
+    def test_cat_multiple_files_and_invalid_utf8(self, tmp_path):
+        (tmp_path / "a.txt").write_text("first\n")
+        (tmp_path / "b.bin").write_bytes(b"bad \xff\xfe bytes\n")
+
+        out = CaptureOutput()
+        self.cat.run(["a.txt", "b.bin"], cwd=tmp_path, env={"out": out})
+        assert out.lines == ["first", "bad \ufffd\ufffd bytes"]
+
+    def test_cat_streams_to_file_descriptor(self, tmp_path):
+        data = bytes(range(256)) * 5000
+        (tmp_path / "big.bin").write_bytes(data)
+        result = tmp_path / "result.bin"
+
+        code = (
+            "from pathlib import Path; from src.commands.builtin_cat import Cat; "
+            f"Cat().run(['big.bin', 'big.bin'], cwd=Path({str(tmp_path)!r}), env={{}})"
+        )
+        with open(result, "wb") as f:
+            subprocess.run([sys.executable, "-c", code], stdout=f, check=True,
+                           cwd=Path(__file__).resolve().parent.parent)
+        assert result.read_bytes() == data + data
+
+
 class TestCp:
     def setup_method(self):
         self.cp = Cp()
@@ -77,6 +128,21 @@ class TestCp:
         assert dst.exists()
         assert dst.read_text() == "A"
 
+    def test_cp_onto_itself_keeps_source(self, tmp_path):
+        (tmp_path / "a.txt").write_text("A")
+        (tmp_path / "dir").mkdir()
+        (tmp_path / "dir" / "f.txt").write_text("F")
+        (tmp_path / "link").symlink_to("dir")
+
+        for args in (["a.txt", "a.txt"], ["a.txt", "."], ["-r", "dir", "link"]):
+            with pytest.raises(ValueError):
+                self.cp.run(args, cwd=tmp_path, env={})
+        with pytest.raises(shutil.SameFileError):
+            copy_file(tmp_path / "a.txt", tmp_path / "a.txt")
+        assert (tmp_path / "a.txt").read_text() == "A"
+        assert (tmp_path / "dir" / "f.txt").read_text() == "F"
+        assert trash.load_index() == {}
+
     def test_cp_dir_requires_recursive_flag(self, tmp_path):
         folder = tmp_path / "srcdir"
         folder.mkdir()
@@ -89,6 +155,92 @@ class TestCp:
         dst_folder = tmp_path / "dst"
         assert (dst_folder / "file.txt").exists()
 
+    def test_cp_parallel_tree_keeps_content_and_mtime(self, tmp_path):
+        src = tmp_path / "srcdir"
+        for i in range(40):
+            sub = src / f"d{i % 4}"
+            sub.mkdir(parents=True, exist_ok=True)
+            (sub / f"f{i}.txt").write_text(f"file {i}" * (i + 1))
+        os.utime(src / "d0" / "f0.txt", ns=(1_000_000_000, 1_000_000_000))
+
+        out = CaptureOutput()
+        self.cp.run(["-r", "-j", "4", "srcdir", "dst"], cwd=tmp_path, env={"out": out})
+
+        for f in src.rglob("*.txt"):
+            copy = tmp_path / "dst" / f.relative_to(src)
+            assert copy.read_text() == f.read_text()
+        assert (tmp_path / "dst" / "d0" / "f0.txt").stat().st_mtime_ns == 1_000_000_000
+        assert out.lines[0].startswith("Скопировано файлов: 40,")
+
+    def test_cp_update_checksum_and_delete(self, tmp_path):
+        src = tmp_path / "srcdir"
+        src.mkdir()
+        (src / "same.txt").write_text("aaaa")
+        self.cp.run(["-r", "srcdir", "dst"], cwd=tmp_path, env={})
+
+        copy = tmp_path / "dst" / "same.txt"
+        st = copy.stat()
+        copy.write_text("bbbb")  # тот же размер и mtime, другое содержимое
+        os.utime(copy, ns=(st.st_atime_ns, st.st_mtime_ns))
+        (src / "new.txt").write_text("new")
+        (tmp_path / "dst" / "old").mkdir()
+        (tmp_path / "dst" / "old" / "x.txt").write_text("x")
+
+        self.cp.run(["-r", "--update", "srcdir", "dst"], cwd=tmp_path, env={})
+        assert copy.read_text() == "bbbb"
+        assert (tmp_path / "dst" / "new.txt").exists()
+        assert (tmp_path / "dst" / "old").exists()
+
+        self.cp.run(["-r", "--checksum", "--delete", "srcdir", "dst"], cwd=tmp_path, env={})
+        assert copy.read_text() == "aaaa"
+        assert not (tmp_path / "dst" / "old").exists()
+
+    def test_cp_dry_run_prints_plan(self, tmp_path):
+        src = tmp_path / "srcdir"
+        src.mkdir()
+        (src / "a.txt").write_text("a")
+        (tmp_path / "dst").mkdir()
+        (tmp_path / "dst" / "extra.txt").write_text("e")
+
+        out = CaptureOutput()
+        self.cp.run(
+            ["-r", "--update", "--delete", "--dry-run", "srcdir", "dst"],
+            cwd=tmp_path, env={"out": out},
+        )
+        assert out.lines[:2] == ["копирование: a.txt", "удаление: extra.txt"]
+        assert not (tmp_path / "dst" / "a.txt").exists()
+        assert (tmp_path / "dst" / "extra.txt").exists()
+
+
+class TestSparse:
+    def make_sparse(self, path):
+        with open(path, "wb") as f:
+            f.truncate(64 * 1024 * 1024)
+            f.seek(32 * 1024 * 1024)
+            f.write(b"data" * 1024)
+        if not is_sparse(path.stat()):
+            pytest.skip("файловая система не поддерживает дыры в файлах")
+
+    def test_copy_keeps_holes(self, tmp_path):
+        src = tmp_path / "img"
+        self.make_sparse(src)
+        copy_file(src, tmp_path / "copy")
+        copy = tmp_path / "copy"
+        assert copy.read_bytes() == src.read_bytes()
+        assert copy.stat().st_blocks <= src.stat().st_blocks
+
+    def test_tar_writes_sparse_member(self, tmp_path):
+        (tmp_path / "vm").mkdir()
+        self.make_sparse(tmp_path / "vm" / "img")
+        Tar().run(["vm", "vm.tar.gz"], cwd=tmp_path, env={})
+
+        with tarfile.open(tmp_path / "vm.tar.gz") as tarf:
+            member = tarf.getmember("vm/img")
+            assert member.sparse[0][0] == 32 * 1024 * 1024
+            tarf.extractall(tmp_path / "out")
+        restored = tmp_path / "out" / "vm" / "img"
+        assert restored.read_bytes() == (tmp_path / "vm" / "img").read_bytes()
+
 
 class TestMv:
     def setup_method(self):
@@ -107,6 +259,74 @@ class TestMv:
         with pytest.raises(FileNotFoundError):
             self.mv.run(["none.txt", "dst.txt"], cwd=tmp_path, env={})
 
+    def test_mv_many_sources_into_dir(self, tmp_path):
+        for name in ("a.txt", "b.txt"):
+            (tmp_path / name).write_text(name)
+        (tmp_path / "docs").mkdir()
+
+        self.mv.run(["a.txt", "b.txt", "docs"], cwd=tmp_path, env={})
+        assert sorted(p.name for p in (tmp_path / "docs").iterdir()) == ["a.txt", "b.txt"]
+
+        with pytest.raises(NotADirectoryError):
+            (tmp_path / "c.txt").write_text("c")
+            self.mv.run(["c.txt", "docs/a.txt", "d.txt"], cwd=tmp_path, env={})
+
+    def test_mv_across_devices_resumes_part(self, tmp_path, monkeypatch):
+        rename = os.rename
+
+        def cross_device(src, dst):
+            if not str(src).endswith(".mvpart"):
+                raise OSError(errno.EXDEV, "Invalid cross-device link")
+            rename(src, dst)
+
+        monkeypatch.setattr(os, "rename", cross_device)
+        src = tmp_path / "data"
+        src.mkdir()
+        (src / "a.txt").write_text("A" * 100)
+        (src / "b.txt").write_text("B")
+        # остаток прерванного перемещения: один файл скопирован не до конца
+        (tmp_path / "dst.mvpart").mkdir()
+        (tmp_path / "dst.mvpart" / "a.txt").write_text("A")
+        # и файл, который из источника успели удалить до повтора
+        (tmp_path / "dst.mvpart" / "gone.txt").write_text("old")
+
+        self.mv.run(["data", "dst"], cwd=tmp_path, env={})
+        assert not src.exists()
+        assert not (tmp_path / "dst.mvpart").exists()
+        assert (tmp_path / "dst" / "a.txt").read_text() == "A" * 100
+        assert (tmp_path / "dst" / "b.txt").read_text() == "B"
+        assert not (tmp_path / "dst" / "gone.txt").exists()
+
+    def test_mv_across_devices_resumes_removal(self, tmp_path, monkeypatch):
+        rename = os.rename
+        rmtree = shutil.rmtree
+
+        def cross_device(src, dst):
+            if not str(src).endswith(".mvpart"):
+                raise OSError(errno.EXDEV, "Invalid cross-device link")
+            rename(src, dst)
+
+        def interrupted(path, *args, **kwargs):
+            (Path(path) / "a.txt").unlink()  # источник удалён не до конца
+            raise KeyboardInterrupt
+
+        monkeypatch.setattr(os, "rename", cross_device)
+        src = tmp_path / "data"
+        src.mkdir()
+        (src / "a.txt").write_text("A")
+        (src / "b.txt").write_text("B")
+
+        monkeypatch.setattr(shutil, "rmtree", interrupted)
+        with pytest.raises(KeyboardInterrupt):
+            self.mv.run(["data", "dst"], cwd=tmp_path, env={})
+        assert (tmp_path / "dst.mvstate").read_text().startswith("removing")
+
+        # повтор не копирует остаток источника внутрь dst и не теряет a.txt
+        monkeypatch.setattr(shutil, "rmtree", rmtree)
+        self.mv.run(["data", "dst"], cwd=tmp_path, env={})
+        assert not src.exists() and not (tmp_path / "dst.mvstate").exists()
+        assert sorted(p.name for p in (tmp_path / "dst").iterdir()) == ["a.txt", "b.txt"]
+
 
 class TestRm:
     def setup_method(self):
@@ -119,19 +339,71 @@ class TestRm:
         self.rm.run(["del.txt"], cwd=tmp_path, env={})
 
         assert not f.exists()
-        trash_file = TRASH_DIR / "del.txt"
-        assert trash_file.exists()
+        [item] = trash.load_index().values()
+        assert item.path == str(f) and item.size == 3
+        assert Path(item.location).read_text() == "bye"
 
-    def test_rm_dir_requires_r_flag(self, tmp_path, capsys):
+    def test_same_names_do_not_overwrite_and_restore(self, tmp_path):
+        f = tmp_path / "del.txt"
+        for text in ("first", "second"):
+            f.write_text(text)
+            self.rm.run(["del.txt"], cwd=tmp_path, env={})
+
+        out = CaptureOutput()
+        TrashCmd().run(["list"], tmp_path, {"out": out})
+        assert len(out.lines) == 2
+
+        first = next(iter(trash.load_index().values()))
+        TrashCmd().run(["restore", first.id], tmp_path, {"out": out})
+        assert f.read_text() == "first"
+        TrashCmd().run(["restore", "del.txt", "again.txt"], tmp_path, {"out": out})
+        assert (tmp_path / "again.txt").read_text() == "second"
+        assert trash.load_index() == {}
+
+    def test_purge_by_age_and_quota(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("builtins.input", lambda _: "y")
+        for i in range(3):
+            tree = tmp_path / f"tree{i}" / "sub"
+            tree.mkdir(parents=True)
+            for j in range(20):
+                (tree / f"{j}.bin").write_bytes(b"x" * 100)
+            self.rm.run(["-r", f"tree{i}"], cwd=tmp_path, env={})
+
+        items = list(trash.load_index().values())
+        trash.update(items[0]._replace(deleted=0))  # удалён очень давно
+        out = CaptureOutput()
+        TrashCmd().run(["purge"], tmp_path, {"out": out})  # всё ещё нужно undo
+        assert len(trash.load_index()) == 3
+        assert out.lines[-1].startswith("Не тронуто объектов: 3")
+
+        TrashCmd().run(["purge", "--force", "--older-than", "1d"], tmp_path, {"out": out})
+        assert not Path(items[0].location).exists()
+        assert len(trash.load_index()) == 2
+
+        TrashCmd().run(["purge", "--force", "--max-size", "2500"], tmp_path, {"out": out})
+        assert list(trash.load_index()) == [items[2].id]
+        assert out.lines[-1] == "Удалено из корзины: 1, освобождено 2.0K"
+
+    def test_rm_dir_requires_r_flag(self, tmp_path):
         folder = tmp_path / "dir_to_remove"
         folder.mkdir()
 
-        self.rm.run(["dir_to_remove"], cwd=tmp_path, env={})
+        with pytest.raises(IsADirectoryError, match="используйте флаг -r"):
+            self.rm.run(["dir_to_remove"], cwd=tmp_path, env={})
+        assert folder.exists()
 
-        out = capsys.readouterr().out
-        assert "Указан каталог, чтобы его рекурсивно удалить используйте флаг -r" in out
+    def test_rm_dir_without_prompt_when_not_interactive(self, tmp_path, monkeypatch):
+        folder = tmp_path / "dir_to_remove"
+        folder.mkdir()
+        monkeypatch.setattr("builtins.input", lambda _: pytest.fail("вопрос в сценарии"))
+
+        with pytest.raises(ValueError, match="-f"):
+            self.rm.run(["-r", "dir_to_remove"], cwd=tmp_path, env={"interactive": False})
         assert folder.exists()
 
+        self.rm.run(["-rf", "dir_to_remove"], cwd=tmp_path, env={"interactive": False})
+        assert not folder.exists()
+
     def test_rm_dir_with_r_and_cancel(self, tmp_path, monkeypatch, capsys):
         folder = tmp_path / "dir_to_remove"
         folder.mkdir()
@@ -145,6 +417,286 @@ class TestRm:
         assert "Удаление отменено" in out
 
 
+class TestUndo:
+    def test_undo_cp_overwrite_with_spaces(self, tmp_path):
+        (tmp_path / "my file.txt").write_text("new")
+        (tmp_path / "old copy.txt").write_text("old")
+        Cp().run(["my file.txt", "old copy.txt"], cwd=tmp_path, env={})
+        assert (tmp_path / "old copy.txt").read_text() == "new"
+
+        out = CaptureOutput()
+        Undo().run([], tmp_path, {"out": out})
+        assert (tmp_path / "old copy.txt").read_text() == "old"
+
+    def test_undo_several_operations(self, tmp_path):
+        (tmp_path / "a.txt").write_text("A")
+        (tmp_path / "dir").mkdir()
+        Mv().run(["a.txt", "dir"], cwd=tmp_path, env={})
+        Rm().run(["dir/a.txt"], cwd=tmp_path, env={"out": CaptureOutput()})
+        Cp().run(["-r", "dir", "copy"], cwd=tmp_path, env={})
+
+        out = CaptureOutput()
+        Undo().run(["3"], tmp_path, {"out": out})
+        assert (tmp_path / "a.txt").read_text() == "A"
+        assert not (tmp_path / "copy").exists()
+        assert out.lines[-1].startswith("Отменяется: mv")
+
+        Undo().run([], tmp_path, {"out": out})
+        assert out.lines[-1] == "Нечего отменять"
+
+    def test_undo_after_backup_was_purged(self, tmp_path):
+        (tmp_path / "x.txt").write_text("X")
+        (tmp_path / "a.txt").write_text("new")
+        (tmp_path / "b.txt").write_text("old")
+        Mv().run(["x.txt", "y.txt"], cwd=tmp_path, env={})
+        Cp().run(["a.txt", "b.txt"], cwd=tmp_path, env={})
+        for item in trash.load_index().values():  # как после trash purge
+            trash.delete_tree(Path(item.location))
+        trash.forget(list(trash.load_index()))
+
+        out = CaptureOutput()
+        Undo().run([], tmp_path, {"out": out})
+        assert (tmp_path / "b.txt").read_text() == "new"  # ничего не удалено наполовину
+        assert "отменить нельзя" in out.lines[-1]
+
+        Undo().run([], tmp_path, {"out": out})
+        assert (tmp_path / "x.txt").read_text() == "X"
+
+    def test_undo_unzip(self, tmp_path):
+        (tmp_path / "src" / "pkg").mkdir(parents=True)
+        (tmp_path / "src" / "pkg" / "m.py").write_text("new")
+        Zip().run(["src", "arc.zip"], cwd=tmp_path, env={"out": CaptureOutput()})
+        (tmp_path / "out").mkdir()
+        (tmp_path / "out" / "pkg").mkdir()
+        (tmp_path / "out" / "pkg" / "m.py").write_text("old")
+
+        Unzip().run(["../arc.zip"], cwd=tmp_path / "out", env={"out": CaptureOutput()})
+        assert (tmp_path / "out" / "pkg" / "m.py").read_text() == "new"
+        Undo().run([], tmp_path, {"out": CaptureOutput()})
+        assert (tmp_path / "out" / "pkg" / "m.py").read_text() == "old"
+
+
+class TestHistoryStore:
+    def test_tail_and_legacy_file_without_index(self, tmp_path):
+        path = tmp_path / ".history"
+        path.write_text("".join(f"cmd {i}\n" for i in range(1, 31)))  # история без индекса
+        store = HistoryStore(path)
+        store.append("ls -l")
+        assert store.tail(3) == [(29, "cmd 29"), (30, "cmd 30"), (31, "ls -l")]
+        assert HistoryStore(path).tail(1) == [(31, "ls -l")]
+
+    def test_rotation_keeps_numbers_and_search(self, tmp_path):
+        store = HistoryStore(tmp_path / ".history", max_size=100, keep=2)
+        for i in range(1, 41):
+            store.append(f"cat file{i}.txt")
+
+        assert (tmp_path / ".history.1").exists()
+        assert not (tmp_path / ".history.3").exists()
+        assert store.tail(2) == [(39, "cat file39.txt"), (40, "cat file40.txt")]
+        assert [n for n, _ in store.tail(8)] == list(range(33, 41))
+        # в текущем и .1 вместе меньше 12 строк, остальное из .2
+        wide = store.tail(12)
+        assert [n for n, _ in wide] == list(range(29, 41))
+        assert all(line == f"cat file{n}.txt" for n, line in wide)
+        found = list(store.search("file3"))
+        assert found[-1] == (39, "cat file39.txt")
+        assert all(line == f"cat file{n}.txt" for n, line in found)
+
+
+class TestTransactions:
+    @pytest.fixture(autouse=True)
+    def quiet_main(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(src.main, "HISTORY_FILE", tmp_path / ".history")
+        monkeypatch.setattr(src.logger, "LOG_FILE", tmp_path / "shell.log")
+
+    def run(self, line, cwd, env):
+        src.main.run_once(line, cwd=cwd, env=env)
+
+    def test_rollback_reverts_whole_batch(self, tmp_path):
+        env = {"out": CaptureOutput()}
+        (tmp_path / "a.txt").write_text("A")
+        (tmp_path / "b.txt").write_text("B")
+
+        self.run("cp a.txt c.txt", tmp_path, env)  # до транзакции
+        for line in ("begin", "cp a.txt b.txt", "mv c.txt d.txt", "rm a.txt", "mv missing x"):
+            self.run(line, tmp_path, env)
+        assert "rollback отменит все её операции" in env["out"].lines[-1]
+
+        self.run("rollback", tmp_path, env)
+        assert env["out"].lines[-1].endswith("отменена, операций: 3")
+        assert sorted(p.name for p in tmp_path.glob("*.txt")) == ["a.txt", "b.txt", "c.txt"]
+        assert (tmp_path / "b.txt").read_text() == "B"
+        assert "txn" not in env
+
+    def test_committed_batch_is_undone_as_one(self, tmp_path):
+        env = {"out": CaptureOutput()}
+        (tmp_path / "a.txt").write_text("A")
+
+        for line in ("begin", "cp a.txt b.txt", "cp b.txt c.txt", "commit"):
+            self.run(line, tmp_path, env)
+        assert env["out"].lines[-1].endswith("зафиксирована, операций: 2")
+
+        Undo().run([], tmp_path, env)
+        assert sorted(p.name for p in tmp_path.glob("*.txt")) == ["a.txt"]
+
+
+class TestPipeline:
+    @pytest.fixture(autouse=True)
+    def quiet_main(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(src.main, "HISTORY_FILE", tmp_path / ".history")
+        monkeypatch.setattr(src.logger, "LOG_FILE", tmp_path / "shell.log")
+
+    def test_cat_grep_head(self, tmp_path):
+        (tmp_path / "big.log").write_text("".join(f"{'ERROR' if i % 3 == 0 else 'ok'} {i}\n" for i in range(1000)))
+        env = {"out": CaptureOutput()}
+        src.main.run_once("cat big.log | grep ERROR | head -n 3", cwd=tmp_path, env=env)
+        src.main.run_once("cat big.log | grep -c ERROR", cwd=tmp_path, env=env)
+        src.main.run_once("ls | grep big", cwd=tmp_path, env=env)
+        src.main.run_once("cat big.log | cd ..", cwd=tmp_path, env=env)
+        lines = env["out"].lines
+        assert lines[:5] == ["ERROR 0", "ERROR 3", "ERROR 6", "334", "big.log"]
+        assert "не принимает данные из конвейера" in lines[5]
+
+    def test_head_stops_upstream(self, tmp_path):
+        pulled = []
+        closed = []
+
+        def source():
+            try:
+                for i in range(1000):
+                    pulled.append(i)
+                    yield f"line {i}"
+            finally:
+                closed.append(True)
+
+        found = Grep().stream(["line"], tmp_path, {}, source())
+        assert list(Head().stream(["-n", "2"], tmp_path, {}, found)) == ["line 0", "line 1"]
+        assert len(pulled) == 2 and closed == [True]
+
+    def test_grep_files_stream_lazily(self, tmp_path, monkeypatch):
+        import src.commands.builtin_grep as grep_module
+        for i in range(5):
+            (tmp_path / f"{i}.txt").write_text("hit\n")
+        searched = []
+        search_file = grep_module.search_file
+        monkeypatch.setattr(grep_module, "search_file", lambda f, q: searched.append(f) or search_file(f, q))
+
+        found = Grep().stream(["hit", "."], tmp_path, {"out": CaptureOutput()})
+        first = list(Head().stream(["-n", "1"], tmp_path, {}, found))
+        assert first == [f"{searched[0]}:1:hit"] and len(searched) == 1
+
+    def test_grep_status_is_not_piped(self, tmp_path):
+        (tmp_path / "a.txt").write_text("aaa\n")
+        env = {"out": CaptureOutput()}
+        src.main.run_once("grep zzz a.txt | grep -c .", cwd=tmp_path, env=env)
+        assert env["out"].lines == ["Совпадений не найдено", "0"]
+
+    def test_split_respects_quotes(self):
+        assert split_pipeline("grep 'a|b' x | head") == ["grep 'a|b' x ", " head"]
+
+
+class TestGlob:
+    @pytest.fixture(autouse=True)
+    def quiet_main(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(src.main, "HISTORY_FILE", tmp_path / ".history")
+        monkeypatch.setattr(src.logger, "LOG_FILE", tmp_path / "shell.log")
+
+    def make_tree(self, root):
+        (root / "logs" / "a" / "b").mkdir(parents=True)
+        (root / ".hidden").mkdir()
+        for rel in ("x.tmp", "y.tmp", ".z.tmp", "logs/1.log", "logs/a/2.log", "logs/a/b/3.log", ".hidden/4.log"):
+            (root / rel).write_text(rel)
+
+    def test_patterns_quotes_and_no_match(self, tmp_path):
+        self.make_tree(tmp_path)
+        env = src.main.new_env(tmp_path)
+
+        def args(line):
+            return src.main.parse_command(line, tmp_path, env)[1]
+
+        assert args("x *.tmp ?.tmp") == ["x.tmp", "y.tmp", "x.tmp", "y.tmp"]
+        assert args("x logs/**/*.log") == ["logs/1.log", "logs/a/2.log", "logs/a/b/3.log"]
+        assert args("x '*.tmp' \"logs\"/[0-9].log .*.tmp */") == ["*.tmp", "logs/1.log", ".z.tmp", "logs/"]
+        assert args("x nothing*") == ["nothing*"]
+
+        env["out"] = CaptureOutput()
+        src.main.run_once("rm *.tmp", cwd=tmp_path, env=env)
+        assert not (tmp_path / "x.tmp").exists() and not (tmp_path / "y.tmp").exists()
+        assert (tmp_path / ".z.tmp").exists()
+
+    def test_each_directory_scanned_once_and_cap(self, tmp_path):
+        self.make_tree(tmp_path)
+        cache = DirCache()
+        expander = Expander(tmp_path, {"dircache": cache})
+        expander.expand("logs/*", "logs/*")
+        expander.expand("logs/*.log", "logs/*.log")
+        assert cache.misses == 1 and cache.hits == 0
+
+        small = Expander(tmp_path, {}, max_matches=2)
+        with pytest.raises(ValueError):
+            small.expand("**", "**")
+
+
+class TestRunScript:
+    @pytest.fixture(autouse=True)
+    def quiet_main(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(src.main, "HISTORY_FILE", tmp_path / ".history")
+        monkeypatch.setattr(src.logger, "LOG_FILE", tmp_path / "shell.log")
+
+    def test_keeps_cwd_and_stops_on_error(self, tmp_path):
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "sub" / "a.txt").write_text("hi\n")
+        env = src.main.new_env(tmp_path)
+        env["out"] = CaptureOutput()
+        script = ["# комментарий", "cd sub", "cat missing.txt", "set -e", "cat a.txt", "bogus", "cat a.txt"]
+
+        cwd, stats, stopped = src.main.run_lines(script, tmp_path, env)
+        assert stopped and cwd == tmp_path / "sub"
+        assert stats.commands == 4 and stats.failed == 2
+        assert stats.by_name["cat"][0] == 2
+        assert env["out"].lines.count("hi") == 1
+        assert "строке 6" in env["out"].lines[-1]
+
+    def test_cli_reads_stdin(self, tmp_path):
+        (tmp_path / "a.txt").write_text("hi\n")
+        result = subprocess.run(
+            [sys.executable, "-m", "src.main", "run-script", "-"],
+            input="cd .\ncat a.txt\n",
+            capture_output=True,
+            text=True,
+            check=False,
+            cwd=tmp_path,  # история и журнал пишутся относительно каталога запуска
+            env={
+                **os.environ,
+                "PYTHONPATH": str(Path(__file__).resolve().parent.parent),
+                "MINISHELL_LOG": str(tmp_path / "shell.log"),
+            },
+        )
+        assert result.returncode == 0
+        assert "hi" in result.stdout and "Команд: 2, ошибок: 0" in result.stdout
+
+    def test_cli_rm_does_not_consume_script_lines(self, tmp_path):
+        (tmp_path / "d").mkdir()
+        (tmp_path / "d" / "x.txt").write_text("x\n")
+        (tmp_path / "a.txt").write_text("hi\n")
+        result = subprocess.run(
+            [sys.executable, "-m", "src.main", "run-script", "-"],
+            input="rm -r d\ny\ncat a.txt\n",  # "y" — команда сценария, а не ответ rm
+            capture_output=True,
+            text=True,
+            check=False,
+            cwd=tmp_path,
+            env={
+                **os.environ,
+                "PYTHONPATH": str(Path(__file__).resolve().parent.parent),
+                "MINISHELL_LOG": str(tmp_path / "shell.log"),
+            },
+        )
+        assert result.returncode == 1
+        assert (tmp_path / "d" / "x.txt").exists()
+        assert "hi" in result.stdout and "Команд: 3, ошибок: 2" in result.stdout
+
+
 class TestGrep:
     def setup_method(self):
         self.grep = Grep()
@@ -170,6 +722,407 @@ class TestGrep:
         out = capsys.readouterr().out
         assert "Совпадений" in out or "не найдено" in out
 
+    def test_grep_parallel_matches_sequential_order(self, tmp_path, capsys):
+        root = tmp_path / "tree"
+        for i in range(40):
+            sub = root / f"d{i % 4}"
+            sub.mkdir(parents=True, exist_ok=True)
+            (sub / f"f{i}.txt").write_text(f"line\nneedle {i}\nother\nneedle again\n")
+
+        self.grep.run(["-r", "-j", "1", "needle", "tree"], cwd=tmp_path, env={})
+        sequential = capsys.readouterr().out
+
+        self.grep.run(["-r", "-j", "4", "needle", "tree"], cwd=tmp_path, env={})
+        parallel = capsys.readouterr().out
+
+        assert parallel == sequential
+        assert len(parallel.splitlines()) == 80
+        assert ":2:needle" in parallel
+
+    def test_grep_literal_and_regex_line_numbers(self, tmp_path, capsys):
+        f = tmp_path / "log.txt"
+        f.write_text("start\nerror: a.b\nok\naxb error\n\nerror error\n")
+
+        self.grep.run(["-F", "a.b", "log.txt"], cwd=tmp_path, env={})
+        out = capsys.readouterr().out
+        assert out.splitlines() == [f"{f}:2:error: a.b"]
+
+        self.grep.run(["a.b", "log.txt"], cwd=tmp_path, env={})
+        out = capsys.readouterr().out
+        assert [line.split(":")[1] for line in out.splitlines()] == ["2", "4"]
+
+        self.grep.run(["^error", "log.txt"], cwd=tmp_path, env={})
+        out = capsys.readouterr().out
+        assert [line.split(":")[1] for line in out.splitlines()] == ["2", "6"]
+
+    def test_grep_encoding(self, tmp_path, capsys):
+        f = tmp_path / "cp.txt"
+        f.write_bytes("первая\nвторая строка\n".encode("cp1251"))
+
+        self.grep.run(["--encoding", "cp1251", "вторая", "cp.txt"], cwd=tmp_path, env={})
+        out = capsys.readouterr().out
+        assert out.strip() == f"{f}:2:вторая строка"
+
+        with pytest.raises(ValueError):
+            self.grep.run(["--encoding", "nope", "x", "cp.txt"], cwd=tmp_path, env={})
+
+    def test_grep_regex_on_non_ascii_stays_within_lines(self, tmp_path):
+        f = tmp_path / "ru.txt"
+        f.write_text("привет мир\nтест\na\n")
+        for pattern, lines in (("пр[иа]вет", [1]), ("пр.вет", [1]), (r"\w+т", [1, 2]), (r"т\sa", [])):
+            out = CaptureOutput()
+            self.grep.run([pattern, "ru.txt"], cwd=tmp_path, env={"out": out})
+            found = [int(line.split(":")[1]) for line in out.lines if line.startswith(str(f))]
+            assert found == lines, pattern
+
+    def test_grep_empty_match_at_end_of_file(self, tmp_path):
+        (tmp_path / "e.txt").write_text("a\n\nb\n")
+        out = CaptureOutput()
+        self.grep.run(["^$", "e.txt"], cwd=tmp_path, env={"out": out})
+        self.grep.run(["-c", "^$", "e.txt"], cwd=tmp_path, env={"out": out})
+        self.grep.run(["-c", "x*", "e.txt"], cwd=tmp_path, env={"out": out})
+        name = tmp_path / "e.txt"
+        assert out.lines == [f"{name}:2:", f"{name}:1", f"{name}:3"]
+
+    def test_grep_utf16_is_decoded_not_skipped_as_binary(self, tmp_path):
+        f = tmp_path / "u16.txt"
+        f.write_text("hello\nпривет world\n", encoding="utf-16")
+        out = CaptureOutput()
+        self.grep.run(["--encoding", "utf-16", "world", "u16.txt"], cwd=tmp_path, env={"out": out})
+        self.grep.run(["--encoding", "utf-16", "-c", "h.llo", "u16.txt"], cwd=tmp_path, env={"out": out})
+        assert out.lines == [f"{f}:2:привет world", f"{f}:1"]
+
+    def test_grep_files_count_and_max(self, tmp_path, capsys):
+        (tmp_path / "a.txt").write_text("x\nhit 1\nhit 2\nhit 3\n")
+        (tmp_path / "b.txt").write_text("nothing\n")
+
+        self.grep.run(["-l", "hit", "."], cwd=tmp_path, env={})
+        assert capsys.readouterr().out.splitlines() == [str(tmp_path / "a.txt")]
+
+        self.grep.run(["-c", "hit", "a.txt"], cwd=tmp_path, env={})
+        assert capsys.readouterr().out.strip() == f"{tmp_path / 'a.txt'}:3"
+
+        self.grep.run(["-m", "2", "hit", "a.txt"], cwd=tmp_path, env={})
+        out = capsys.readouterr().out
+        assert [line.split(":")[1] for line in out.splitlines()] == ["2", "3"]
+
+    def test_grep_skips_binary_files(self, tmp_path, capsys):
+        (tmp_path / "img.bin").write_bytes(b"\x89PNG\0\0needle\n")
+        (tmp_path / "t.txt").write_text("needle\n")
+
+        self.grep.run(["needle", "."], cwd=tmp_path, env={})
+        out = capsys.readouterr().out
+        assert "t.txt:1:needle" in out
+        assert "img.bin" not in out
+
+    def test_grep_invalid_jobs(self, tmp_path):
+        (tmp_path / "a.txt").write_text("x")
+        with pytest.raises(ValueError):
+            self.grep.run(["-j", "0", "x", "a.txt"], cwd=tmp_path, env={})
+
+
+class TestIndex:
+    def setup_method(self):
+        self.index = IndexCmd()
+        self.grep = Grep()
+
+    def test_index_narrows_and_stays_correct(self, tmp_path, monkeypatch, capsys):
+        monkeypatch.setattr("src.search_index.INDEX_DIR", tmp_path / ".index")
+        root = tmp_path / "tree"
+        root.mkdir()
+        (root / "a.txt").write_text("alpha needle\n")
+        (root / "b.txt").write_text("beta\n")
+
+        self.index.run(["build", "tree"], cwd=tmp_path, env={})
+        assert "обновлено 2" in capsys.readouterr().out
+
+        query = Query("needle", 0, True, "utf-8")
+        narrowed = self.grep._narrow_by_index(walk_files(root), root, query)
+        assert [rel for rel, _ in narrowed] == ["a.txt"]
+
+        # изменённые после построения и новые файлы проверяются всегда
+        (root / "b.txt").write_text("beta needle!\n")
+        (root / "c.txt").write_text("needle\n")
+        self.grep.run(["-r", "needle", "tree"], cwd=tmp_path, env={})
+        out = capsys.readouterr().out
+        assert "a.txt:1" in out and "b.txt:1" in out and "c.txt:1" in out
+
+        self.index.run(["update", "tree"], cwd=tmp_path, env={})
+        assert "обновлено 2, удалено 0, без изменений 1" in capsys.readouterr().out
+
+    def test_index_keeps_zero_counts(self, tmp_path, monkeypatch, capsys):
+        monkeypatch.setattr("src.search_index.INDEX_DIR", tmp_path / ".index")
+        root = tmp_path / "tree"
+        root.mkdir()
+        (root / "a.txt").write_text("needle\n")
+        (root / "b.txt").write_text("beta\n")
+        self.index.run(["build", "tree"], cwd=tmp_path, env={})
+        capsys.readouterr()
+
+        self.grep.run(["-r", "-c", "needle", "tree"], cwd=tmp_path, env={})
+        assert sorted(capsys.readouterr().out.splitlines()) == [f"{root / 'a.txt'}:1", f"{root / 'b.txt'}:0"]
+
+    def test_index_update_requires_build(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("src.search_index.INDEX_DIR", tmp_path / ".index")
+        with pytest.raises(FileNotFoundError):
+            self.index.run(["update"], cwd=tmp_path, env={})
+
+
+class TestWalk:
+    def make_tree(self, root):
+        for rel in ("a.txt", "b.log", "src/c.py", "src/__pycache__/c.pyc",
+                    "build/out.txt", "node_modules/pkg/i.js", "logs/keep.log"):
+            p = root / rel
+            p.parent.mkdir(parents=True, exist_ok=True)
+            p.write_text(rel)
+        (root / ".gitignore").write_text("# comment\n*.log\n!keep.log\nbuild/\n")
+
+    def test_walk_ignore_rules_and_excludes(self, tmp_path):
+        self.make_tree(tmp_path)
+
+        files = {rel for rel, _ in walk_files(tmp_path, exclude=["node_modules", "*.pyc"],
+                                              ignore_files=True)}
+        assert files == {".gitignore", "a.txt", "src/c.py", "logs/keep.log"}
+
+        everything = {rel for rel, _ in walk(tmp_path)}
+        assert "node_modules/pkg/i.js" in everything and "build" in everything
+
+    def test_walk_yields_dir_before_contents(self, tmp_path):
+        self.make_tree(tmp_path)
+        order = [rel for rel, _ in walk(tmp_path)]
+        assert order.index("src") < order.index("src/c.py")
+        assert order.index("src/__pycache__") < order.index("src/__pycache__/c.pyc")
+
+    def test_grep_and_cp_use_walker(self, tmp_path, capsys):
+        self.make_tree(tmp_path / "tree")
+
+        Grep().run(["-r", "-l", ".", "tree"], cwd=tmp_path, env={})
+        out = capsys.readouterr().out
+        assert "node_modules" not in out and "__pycache__" not in out and "b.log" not in out
+        assert "c.py" in out
+
+        Cp().run(["-r", "--exclude", "node_modules", "tree", "copy"], cwd=tmp_path, env={})
+        assert (tmp_path / "copy" / "src" / "__pycache__" / "c.pyc").exists()
+        assert not (tmp_path / "copy" / "node_modules").exists()
+
+    def test_grep_in_session_uses_cached_listing(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(src.main, "HISTORY_FILE", tmp_path / ".history")
+        monkeypatch.setattr(src.logger, "LOG_FILE", tmp_path / "shell.log")
+        work = tmp_path / "work"  # история и лог лежат рядом и тоже содержат hit
+        (work / "sub" / "deep").mkdir(parents=True)
+        (work / "sub" / "a.txt").write_text("hit\n")
+        (work / "sub" / "deep" / "b.txt").write_text("hit\n")
+        env = src.main.new_env(work)
+        env["out"] = CaptureOutput()
+
+        src.main.run_once("grep hit sub", cwd=work, env=env)
+        src.main.run_once("grep -r -l hit .", cwd=work, env=env)
+        assert env["out"].lines == [
+            f"{work / 'sub' / 'a.txt'}:1:hit",
+            str(work / "sub" / "a.txt"),
+            str(work / "sub" / "deep" / "b.txt"),
+        ]
+        assert env["dircache"].misses > 0
+
+
+class TestOutput:
+    def test_output_buffers_until_flush(self):
+        stream = io.StringIO()
+        out = Output(stream, buffer_size=1024)
+        out.write("a")
+        out.write("b")
+        assert stream.getvalue() == ""
+        out.flush()
+        assert stream.getvalue() == "a\nb\n"
+
+    def test_output_flushes_when_buffer_is_full(self):
+        stream = io.StringIO()
+        out = Output(stream, buffer_size=8)
+        out.write("12345")
+        out.write("67890")
+        assert stream.getvalue() == "12345\n67890\n"
+
+    def test_isatty_checked_once_per_stream(self):
+        class Counting(io.StringIO):
+            calls = 0
+
+            def isatty(self):
+                Counting.calls += 1
+                return False
+
+        out = Output(Counting(), buffer_size=1024)
+        for i in range(100):
+            out.write(str(i))
+        assert Counting.calls == 1
+
+    def test_commands_write_to_env_output(self, tmp_path):
+        (tmp_path / "a.txt").write_text("needle\n")
+        out = CaptureOutput()
+        Grep().run(["needle", "a.txt"], cwd=tmp_path, env={"out": out})
+        assert out.lines == [f"{tmp_path / 'a.txt'}:1:needle"]
+
+
+class TestLogger:
+    def test_structured_record_and_rotation(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(src.logger, "LOG_FILE", tmp_path / "logs" / "shell.log")
+        handler = src.logger.make_file_handler()
+        assert handler.maxBytes == src.logger.LOG_MAX_BYTES
+
+        record = logging.LogRecord("mini_shell", logging.INFO, "", 0, "ls -l", None, None)
+        record.__dict__.update({"command": "ls", "argv": ["-l"], "result": "ok", "bytes": 12})
+        handler.emit(record)
+        handler.close()
+        line = (tmp_path / "logs" / "shell.log").read_text(encoding="utf-8")
+        assert line.rstrip().endswith('ls -l | command="ls" argv=["-l"] result="ok" bytes=12')
+
+
+class TestDirCache:
+    def test_hits_misses_and_validation(self, tmp_path):
+        cache = DirCache()
+        (tmp_path / "a.txt").write_text("a")
+
+        assert [e.name for e in cache.listdir(tmp_path)] == ["a.txt"]
+        assert [e.name for e in cache.listdir(tmp_path)] == ["a.txt"]
+        assert (cache.hits, cache.misses) == (1, 1)
+
+        (tmp_path / "b.txt").write_text("b")  # mtime каталога изменился
+        assert sorted(e.name for e in cache.listdir(tmp_path)) == ["a.txt", "b.txt"]
+        assert cache.misses == 2
+
+    def test_lru_bound(self, tmp_path):
+        cache = DirCache(max_dirs=2)
+        for name in ("a", "b", "c"):
+            (tmp_path / name).mkdir()
+            cache.listdir(tmp_path / name)
+        assert cache.stats()["dirs"] == 2
+        cache.listdir(tmp_path / "a")  # вытеснен первым
+        assert cache.misses == 4
+
+    def test_lookup_does_not_scan_uncached_parent(self, tmp_path):
+        cache = DirCache()
+        env = {"dircache": cache}
+        (tmp_path / "sub").mkdir()
+        assert path_kind(env, tmp_path / "sub") == "dir"
+        assert cache.misses == 0 and cache.stats()["dirs"] == 0  # только stat
+
+        cache.listdir(tmp_path)
+        assert path_kind(env, tmp_path / "sub") == "dir"
+        assert path_kind(env, tmp_path / "nope") is None
+        assert (cache.hits, cache.misses) == (2, 1)
+
+    def test_commands_use_and_invalidate_cache(self, tmp_path):
+        cache = DirCache()
+        env = {"dircache": cache, "out": CaptureOutput()}
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "a.txt").write_text("A")
+
+        Ls().run([str(tmp_path)], tmp_path, env)
+        assert Cd().run(["sub"], cwd=tmp_path, env=env) == tmp_path / "sub"
+        assert cache.hits >= 1
+
+        Cp().run(["a.txt", "b.txt"], cwd=tmp_path, env=env)
+        assert cache.invalidations >= 1
+        Ls().run([str(tmp_path)], tmp_path, env)
+        assert env["out"].lines == ["a.txt", "sub", "a.txt", "b.txt", "sub"]
+
+
+class TestDu:
+    def setup_method(self):
+        self.du = Du()
+
+    def make_tree(self, root):
+        (root / "sub" / "deep").mkdir(parents=True)
+        (root / "a.bin").write_bytes(b"x" * 10000)
+        (root / "sub" / "b.bin").write_bytes(b"x" * 20000)
+        (root / "sub" / "deep" / "c.bin").write_bytes(b"x" * 30000)
+
+    def sizes(self, out):
+        return {Path(line.split("\t")[1]).name: int(line.split("\t")[0]) for line in out.lines}
+
+    def test_du_totals_and_depth(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("src.commands.builtin_du.DU_CACHE_FILE", tmp_path / ".du")
+        root = tmp_path / "tree"
+        self.make_tree(root)
+
+        out = CaptureOutput()
+        self.du.run(["tree"], cwd=tmp_path, env={"out": out})
+        sizes = self.sizes(out)
+        assert [Path(line.split("\t")[1]).name for line in out.lines] == ["deep", "sub", "tree"]
+        assert sizes["tree"] >= sizes["sub"] >= sizes["deep"] >= 29
+        assert sizes["tree"] >= 60
+
+        out = CaptureOutput()
+        self.du.run(["-s", "tree"], cwd=tmp_path, env={"out": out})
+        assert list(self.sizes(out)) == ["tree"]
+
+        out = CaptureOutput()
+        self.du.run(["--max-depth", "1", "tree"], cwd=tmp_path, env={"out": out})
+        assert list(self.sizes(out)) == ["sub", "tree"]
+
+    def test_du_counts_hardlinks_once(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("src.commands.builtin_du.DU_CACHE_FILE", tmp_path / ".du")
+        root = tmp_path / "tree"
+        self.make_tree(root)
+        out = CaptureOutput()
+        self.du.run(["-s", "tree"], cwd=tmp_path, env={"out": out})
+        before = self.sizes(out)["tree"]
+
+        os.link(root / "sub" / "b.bin", root / "link.bin")
+        out = CaptureOutput()
+        self.du.run(["-s", "tree"], cwd=tmp_path, env={"out": out})
+        assert self.sizes(out)["tree"] == before
+
+    def test_du_rescans_only_changed_dirs(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("src.commands.builtin_du.DU_CACHE_FILE", tmp_path / ".du")
+        root = tmp_path / "tree"
+        self.make_tree(root)
+        self.du.run(["tree"], cwd=tmp_path, env={"out": CaptureOutput()})
+
+        read = []
+        original = DuScan._read_dir
+        monkeypatch.setattr(DuScan, "_read_dir",
+                            staticmethod(lambda path: read.append(path) or original(path)))
+        (root / "sub" / "new.bin").write_bytes(b"x" * 50000)
+        out = CaptureOutput()
+        self.du.run(["tree"], cwd=tmp_path, env={"out": out})
+        assert read == [str(root / "sub")]
+        assert self.sizes(out)["tree"] >= 110
+
+
+class TestHeadTail:
+    def test_head_and_tail(self, tmp_path):
+        (tmp_path / "a.txt").write_text("".join(f"{i}\n" for i in range(1, 21)))
+        out = CaptureOutput()
+        Head().run(["-n", "3", "a.txt"], tmp_path, {"out": out})
+        Tail().run(["-n2", "a.txt"], tmp_path, {"out": out})
+        assert out.lines == ["1", "2", "3", "19", "20"]
+
+    def test_tail_reads_blocks_from_end(self, tmp_path):
+        lines = [f"line {i}" for i in range(30000)]  # несколько блоков, без \n в конце
+        (tmp_path / "big.txt").write_text("\n".join(lines))
+        out = CaptureOutput()
+        Tail().run(["-n", "15000", "big.txt"], tmp_path, {"out": out})
+        assert out.lines == lines[-15000:]
+
+    def test_follow_prints_appended_data(self, tmp_path):
+        target = tmp_path / "log.txt"
+        target.write_text("old\n")
+        out = CaptureOutput()
+        stop = threading.Event()
+        with open(target, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            thread = threading.Thread(target=follow, args=(f, target, out, stop, 0.05))
+            thread.start()
+            with open(target, "a") as w:
+                w.write("new\n")
+            for _ in range(100):
+                if out.lines:
+                    break
+                time.sleep(0.02)
+            stop.set()
+            thread.join()
+        assert out.lines == ["new"]
+
 
 class TestZipUnzip:
     def setup_method(self):
@@ -191,6 +1144,18 @@ class TestZipUnzip:
         assert extracted_file.exists()
         assert extracted_file.read_text() == "data"
 
+    def test_unzip_does_not_touch_paths_outside_cwd(self, tmp_path):
+        work = tmp_path / "work"
+        work.mkdir()
+        (tmp_path / "precious.txt").write_text("keep")
+        with zipfile.ZipFile(work / "evil.zip", "w") as zipf:
+            zipf.writestr("../precious.txt", "evil")
+
+        self.unzip_cmd.run(["evil.zip"], cwd=work, env={"out": CaptureOutput()})
+        assert (tmp_path / "precious.txt").read_text() == "keep"
+        assert (work / "precious.txt").read_text() == "evil"  # zipfile убирает '..'
+        assert trash.load_index() == {}
+
 
 class TestTarUntar:
     def setup_method(self):
@@ -210,4 +1175,19 @@ class TestTarUntar:
 
         extracted = tmp_path / "folder"
         assert extracted.is_dir()
-        assert (extracted / "f.txt").exists()
\ No newline at end of file
+        assert (extracted / "f.txt").exists()
+
+    def test_untar_rejects_paths_outside_cwd(self, tmp_path):
+        work = tmp_path / "work"
+        work.mkdir()
+        (tmp_path / "precious.txt").write_text("keep")
+        (work / "precious.txt").write_text("local")
+        with tarfile.open(work / "evil.tar.gz", "w:gz") as tarf:
+            tarf.add(work / "precious.txt", arcname="precious.txt")
+            tarf.add(work / "precious.txt", arcname="../precious.txt")
+
+        with pytest.raises(ValueError):
+            self.untar_cmd.run(["evil.tar.gz"], cwd=work, env={"out": CaptureOutput()})
+        assert (tmp_path / "precious.txt").read_text() == "keep"
+        assert (work / "precious.txt").read_text() == "local"
+        assert trash.load_index() == {}